@@ -0,0 +1,308 @@
+"""ASGI entrypoint: the hot read paths on an async engine, the rest on Flask.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5003
+
+GET /shows/, GET /shows/<show_id> and POST /shows/batch-get are served by
+coroutines that run their queries on an asyncpg engine (aiosqlite for the
+sqlite stand-in), so a slow query holds a pooled connection and a coroutine
+rather than a thread. Every other route, the Swagger docs included, is the
+Flask app from main.py mounted as WSGI on a thread pool.
+
+The coroutines build their queries with main.py's functions and share its
+response cache, compression and encodings, so either side answers a request
+the same way. With CATALOG_BACKEND=memory the reads don't touch the
+database and all of them stay on Flask.
+
+    ASYNC_DATABASE_URL  the async engine, by default DATABASE_URL with an
+                        async driver, or the Cloud SQL instance's unix socket
+                        with the DB_* credentials
+    WSGI_THREADS        threads running the Flask routes (default 8)
+
+The async pool is sized from the same DB_POOL_* variables as pool.py.
+"""
+import contextlib
+import os
+import time
+from functools import wraps
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+import uvicorn
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_etags, quote_etag
+
+import main
+from metrics import REQUEST_DURATION
+from pool import pool_options_from_env
+from response_cache import cache_key, etag_of
+from serialization import FORMATS, dumps, format_for
+
+# the sync dialects' async counterparts
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url() -> URL:
+    if os.environ.get("ASYNC_DATABASE_URL"):
+        return make_url(os.environ["ASYNC_DATABASE_URL"])
+    if os.environ.get("DATABASE_URL"):
+        _url = make_url(os.environ["DATABASE_URL"])
+        return _url.set(drivername=ASYNC_DRIVERS[_url.get_backend_name()])
+    # the credentials are filled in per connection, see `_connect`
+    return URL.create(
+        "postgresql+asyncpg",
+        query={"host": f"/cloudsql/{main.INSTANCE_CONNECTION_NAME}"},
+    )
+
+
+def async_pool_options(url:URL) -> dict:
+    """pool.py's options on the asyncio flavour of QueuePool."""
+    _options = pool_options_from_env(str(url))
+    if _options:
+        _options["poolclass"] = AsyncAdaptedQueuePool
+        # check_same_thread is for the sync sqlite driver
+        _options.pop("connect_args", None)
+    return _options
+
+
+def _connect(dialect, connection_record, cargs, cparams):
+    # like main.open_connection, retry once with freshly fetched credentials
+    # in case the secrets were rotated since they were cached
+    def _with_credentials():
+        cparams.update(
+            user=main.credentials.get("DB_USER"),
+            password=main.credentials.get("DB_PASS"),
+            database=main.credentials.get("DB_NAME"),
+        )
+        return dialect.connect(*cargs, **cparams)
+
+    try:
+        return _with_credentials()
+    except Exception:
+        main.credentials.invalidate()
+        return _with_credentials()
+
+
+def create_engine_from_env():
+    _url = async_database_url()
+    _engine = create_async_engine(_url, **async_pool_options(_url))
+    if not os.environ.get("ASYNC_DATABASE_URL") and not os.environ.get("DATABASE_URL"):
+        event.listen(_engine.sync_engine, "do_connect", _connect)
+    return _engine
+
+
+engine = create_engine_from_env()
+
+
+async def _execute(statement) -> list:
+    async with engine.connect() as _connection:
+        return (await _connection.execute(statement)).all()
+
+
+def _args(request:Request) -> MultiDict:
+    # the werkzeug form of the query string, which main.py's parsers read
+    return MultiDict(request.query_params.multi_items())
+
+
+def _encoded(request:Request, obj, headers:dict=None) -> Response:
+    """main.json_response for the coroutines."""
+    _format = format_for(request.headers.get("accept"))
+    return Response(
+        FORMATS[_format](obj),
+        headers={**(headers or {}), "Vary": "Accept"},
+        media_type=_format,
+    )
+
+
+def _compressed(request:Request, response:Response) -> Response:
+    """The after_request compression of main.py's Flask app."""
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    # every body served here is one of the compressible encodings
+    response.headers.add_vary_header("Accept-Encoding")
+    _body, _encoding = main.compression.compress_body(
+        response.body,
+        response.headers.get("content-type", "").split(";")[0],
+        request.headers.get("accept-encoding"),
+    )
+    if _encoding is None:
+        return response
+    response.body = _body
+    response.headers["Content-Length"] = str(len(_body))
+    response.headers["Content-Encoding"] = _encoding
+    _etag = response.headers.get("ETag")
+    if _etag and not _etag.startswith("W/"):
+        # the bytes differ per encoding
+        response.headers["ETag"] = "W/" + _etag
+    return response
+
+
+def served(rule:str):
+    """Error handling, compression and request metrics of an async handler.
+
+    `rule` is the Flask rule of the route, so the metrics of both sides
+    share labels.
+    """
+
+    def _decorator(handler):
+        @wraps(handler)
+        async def _wrapper(request:Request) -> Response:
+            _started = time.perf_counter()
+            try:
+                _response = await handler(request)
+            except HTTPException as error:
+                # ns.abort's message, in flask-restx's error body
+                _data = getattr(error, "data", None) or {"message": error.description}
+                _response = Response(
+                    dumps(_data), status_code=error.code, media_type="application/json"
+                )
+            _response = _compressed(request, _response)
+            REQUEST_DURATION.observe(
+                time.perf_counter() - _started,
+                rule,
+                request.method,
+                _response.status_code,
+            )
+            return _response
+
+        return _wrapper
+
+    return _decorator
+
+
+def cached(defaults:dict=None, case_insensitive=()):
+    """main.response_cache.cached for the coroutines, sharing its entries."""
+
+    def _conditional(request:Request, body:bytes, status:int, headers:dict, etag:str):
+        _headers = {
+            **headers,
+            "ETag": quote_etag(etag),
+            "Cache-Control": f"public, max-age={main.response_cache.max_age}",
+        }
+        if parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+            return Response(
+                status_code=304,
+                headers={k: _headers[k] for k in ("ETag", "Cache-Control")},
+            )
+        return Response(body, status_code=status, headers=_headers)
+
+    def _decorator(handler):
+        @wraps(handler)
+        async def _wrapper(request:Request) -> Response:
+            _key = cache_key(
+                request.url.path,
+                _args(request),
+                format_for(request.headers.get("accept")),
+                defaults,
+                case_insensitive,
+            )
+            _entry = main.response_cache.get(_key)
+            if _entry is not None:
+                _, _, _etag, _status, _headers, _body = _entry
+                _headers = {**_headers, "X-Cache": "HIT"}
+                return _conditional(request, _body, _status, _headers, _etag)
+
+            _version = main.response_cache.version
+            _response = await handler(request)
+            if _response.status_code != 200:
+                return _response
+            _body = _response.body
+            _etag = etag_of(_body)
+            _headers = dict(_response.headers)
+            main.response_cache.put(
+                _key, _version, _etag, _response.status_code, _headers, _body
+            )
+            _headers["X-Cache"] = "MISS"
+            return _conditional(request, _body, _response.status_code, _headers, _etag)
+
+        return _wrapper
+
+    return _decorator
+
+
+@served("/shows/")
+@cached(
+    defaults=main.LIST_CACHE_DEFAULTS, case_insensitive=main.CASE_INSENSITIVE_PARAMS
+)
+async def list_shows(request:Request) -> Response:
+    _query_args = _args(request)
+    _statement, _render = main.shows_page(
+        _query_args, *main.parse_page_args(_query_args)
+    )
+    _results, _headers = _render(await _execute(_statement))
+    return _encoded(request, _results, _headers)
+
+
+@served("/shows/<string:show_id>")
+@cached()
+async def get_show(request:Request) -> Response:
+    _show_id = request.path_params["show_id"]
+    _fields = main.parse_fields(_args(request).getlist("fields"))
+    _rows = await _execute(main.shows_by_id_select([_show_id], _fields))
+    _found = main.shows_by_id(_rows, _fields)
+    if _show_id not in _found:
+        main.ns.abort(404, f"no show with show_id {_show_id!r}")
+    return _encoded(request, _found[_show_id])
+
+
+@served("/shows/batch-get")
+async def batch_get(request:Request) -> Response:
+    try:
+        _content = await request.json()
+    except ValueError:
+        _content = None
+    _show_ids, _fields = main.parse_batch_get(_content)
+    _found = {}
+    if _show_ids:
+        _rows = await _execute(main.shows_by_id_select(_show_ids, _fields))
+        _found = main.shows_by_id(_rows, _fields)
+    return _encoded(request, main.batch_get_result(_show_ids, _found))
+
+
+ASYNC_ROUTES = (
+    Route("/shows/", list_shows, methods=["GET"]),
+    Route("/shows/batch-get", batch_get, methods=["POST"]),
+    Route("/shows/{show_id}", get_show, methods=["GET"]),
+)
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    yield
+    await engine.dispose()
+
+
+def create_app(flask_app=None) -> Starlette:
+    flask_app = flask_app or main.app
+    _flask = WSGIMiddleware(flask_app, workers=int(os.environ.get("WSGI_THREADS", 8)))
+    _routes = []
+    if main.catalog is None:
+        _async_paths = {r.path for r in ASYNC_ROUTES}
+        # Flask's fixed paths under /shows/, e.g. /shows/export, go to Flask
+        # before /shows/{show_id} can take them
+        _routes += [
+            Route(_rule.rule, _flask)
+            for _rule in flask_app.url_map.iter_rules()
+            if _rule.rule.startswith("/shows/")
+            and "<" not in _rule.rule
+            and _rule.rule not in _async_paths
+        ]
+        _routes += ASYNC_ROUTES
+    # other methods on the async paths, e.g. POST /shows/, fall through to here
+    _routes.append(Mount("/", app=_flask))
+    return Starlette(routes=_routes, lifespan=_lifespan)
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    _host, _, _port = os.environ.get("LISTEN", "0.0.0.0:5003").rpartition(":")
+    uvicorn.run(app, host=_host, port=int(_port))
@@ -0,0 +1,66 @@
+"""Fill duration_minutes and seasons for shows loaded before they existed.
+
+    python backfill_durations.py [--batch-size N]
+
+Walks the shows table in show_id order, a batch per transaction, so the
+backfill never holds locks on more than one batch of rows. Safe to rerun,
+rows that already have either column set are skipped.
+"""
+import argparse
+
+import sqlalchemy
+
+from durations import parse_duration
+from main import Show, db
+
+BATCH_SIZE = 1000
+
+
+def backfill(engine, table, batch_size:int=BATCH_SIZE) -> int:
+    _updated = 0
+    _last_show_id = ""
+    _update = (
+        table.update()
+        .where(table.c.show_id == sqlalchemy.bindparam("_show_id"))
+        .values(
+            duration_minutes=sqlalchemy.bindparam("duration_minutes"),
+            seasons=sqlalchemy.bindparam("seasons"),
+        )
+    )
+    while True:
+        with engine.begin() as _connection:
+            _rows = _connection.execute(
+                sqlalchemy.select(table.c.show_id, table.c.duration)
+                .where(
+                    table.c.show_id > _last_show_id,
+                    table.c.duration_minutes.is_(None),
+                    table.c.seasons.is_(None),
+                )
+                .order_by(table.c.show_id)
+                .limit(batch_size)
+            ).all()
+            if not _rows:
+                return _updated
+            _last_show_id = _rows[-1].show_id
+            _values = []
+            for _row in _rows:
+                _minutes, _seasons = parse_duration(_row.duration)
+                if _minutes is not None or _seasons is not None:
+                    _values.append(
+                        {
+                            "_show_id": _row.show_id,
+                            "duration_minutes": _minutes,
+                            "seasons": _seasons,
+                        }
+                    )
+            if _values:
+                _connection.execute(_update, _values)
+            _updated += len(_values)
+        print(f"backfilled {_updated} shows, up to {_last_show_id}")
+
+
+if __name__ == "__main__":
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    _args = _parser.parse_args()
+    backfill(db.engine, Show.__table__, _args.batch_size)
@@ -0,0 +1,375 @@
+"""Benchmark the shows API against a seeded local database.
+
+    python benchmark.py [--scale 10000] [--mix browse] [--requests 2000]
+                        [--concurrency 8] [--baseline bench.json]
+                        [--save-baseline bench.json]
+
+Seeds DATABASE_URL (a sqlite file by default; a local postgres needs
+`python migrate.py` first) with a deterministic synthetic catalog of
+`--scale` shows, then drives a weighted mix of list, filter, sort, paging,
+search, summary and upsert requests through the app in-process, or against
+a running server with `--url`. Reports p50/p95/p99 latency, throughput and
+SQL statements per request (from the Server-Timing header) per request
+kind. `--save-baseline` writes the results and `--baseline` compares a run
+against them, exiting nonzero when a percentile regressed by more than
+`--tolerance`.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+SEED = 1234
+TYPES = ("Movie",) * 7 + ("TV Show",) * 3
+RATINGS = ("TV-MA", "TV-14", "TV-PG", "R", "PG-13", "PG", "TV-Y7", "TV-G", "G", "NR")
+COUNTRIES = (
+    "United States", "India", "United Kingdom", "Japan", "South Korea", "Canada",
+    "Spain", "France", "Mexico", "Egypt", "Turkey", "Nigeria", "Brazil", "Germany",
+)
+GENRES = (
+    "Dramas", "Comedies", "International Movies", "Documentaries", "Action & Adventure",
+    "International TV Shows", "Independent Movies", "Thrillers", "Romantic Movies",
+    "Kids' TV", "Crime TV Shows", "Horror Movies", "Stand-Up Comedy", "Docuseries",
+)
+WORDS = (
+    "love", "night", "war", "secret", "last", "house", "world", "story", "life",
+    "girl", "king", "dark", "city", "home", "road", "heart", "game", "dream",
+    "blood", "water", "fire", "summer", "escape", "family", "ghost", "school",
+)
+FIRST_NAMES = ("Ana", "Ben", "Chen", "Dev", "Eva", "Femi", "Gia", "Hiro", "Ines", "Jon")
+LAST_NAMES = ("Smith", "Kumar", "Kim", "Garcia", "Okafor", "Sato", "Rossi", "Khan")
+
+
+def synthetic_show(index:int, rng:random.Random, people:int) -> dict:
+    """One deterministic show, long tailed like the real catalog."""
+    _type = rng.choice(TYPES)
+
+    def _person():
+        # a few prolific people and a long tail, like the real cast lists
+        _id = int(rng.paretovariate(1.2)) % people
+        return f"{FIRST_NAMES[_id % 10]} {LAST_NAMES[_id % 8]} {_id}"
+
+    def _maybe_list(choices, most:int):
+        _values = sorted({choices() for _ in range(rng.randint(0, most))})
+        return _values or None
+
+    return {
+        "show_id": f"s{index}",
+        "type": _type,
+        "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        + f" {index}",
+        "director": _maybe_list(_person, 2),
+        "cast": _maybe_list(_person, 8),
+        "country": _maybe_list(lambda: rng.choice(COUNTRIES), 3),
+        "date_added": datetime.date(2008, 1, 1)
+        + datetime.timedelta(days=rng.randint(0, 14 * 365)),
+        "release_year": rng.randint(1940, 2021),
+        "rating": rng.choice(RATINGS),
+        "duration": f"{rng.randint(60, 180)} min"
+        if _type == "Movie"
+        else f"{rng.randint(1, 9)} Seasons",
+        "listed_in": _maybe_list(lambda: rng.choice(GENRES), 3),
+        "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))),
+    }
+
+
+def seed(scale:int, reseed:bool=False, batch_size:int=5000):
+    from durations import parse_duration
+    from bridges import refresh_bridges
+    from main import BRIDGE_TABLES, SUMMARY_TABLES, Show, db, suggestions
+    from summary import refresh_summaries
+
+    _table = Show.__table__
+    _existing = db.session.query(Show).count()
+    if _existing == scale and not reseed:
+        print(f"using the {_existing} shows already seeded")
+        return
+    _started = time.perf_counter()
+    db.session.execute(_table.delete())
+    _rng = random.Random(SEED)
+    _people = max(100, scale // 5)
+    _batch = []
+    for _index in range(1, scale + 1):
+        _show = synthetic_show(_index, _rng, _people)
+        _show["duration_minutes"], _show["seasons"] = parse_duration(_show["duration"])
+        _batch.append(_show)
+        if len(_batch) >= batch_size:
+            db.session.execute(_table.insert(), _batch)
+            _batch = []
+    if _batch:
+        db.session.execute(_table.insert(), _batch)
+    refresh_bridges(db.session, Show, BRIDGE_TABLES)
+    refresh_summaries(db.session, Show, SUMMARY_TABLES)
+    db.session.commit()
+    # seeded around the API, so its in-memory index is rebuilt by hand
+    suggestions.load_database(db.engine, _table)
+    print(f"seeded {scale} shows in {time.perf_counter() - _started:.1f}s")
+
+
+def _bulk_body(rng:random.Random) -> bytes:
+    _shows = []
+    for _ in range(10):
+        _show = synthetic_show(rng.randint(1, 10 ** 9), rng, 1000)
+        _show["show_id"] = f"bench-{rng.randint(1, 1000)}"
+        _show["date_added"] = _show["date_added"].isoformat()
+        _shows.append(_show)
+    return json.dumps(_shows).encode("UTF-8")
+
+
+# request kind -> function(rng, scale) returning (method, path, body)
+REQUESTS = {
+    "list": lambda rng, scale: ("GET", "/shows/", None),
+    "filter_type_rating": lambda rng, scale: (
+        "GET", f"/shows/?type={rng.choice(TYPES)}&rating={rng.choice(RATINGS)}", None,
+    ),
+    "filter_country_genre": lambda rng, scale: (
+        "GET",
+        f"/shows/?country={rng.choice(COUNTRIES)}&listed_in={rng.choice(GENRES)}",
+        None,
+    ),
+    "filter_cast_any": lambda rng, scale: (
+        "GET",
+        "/shows/?match=any&"
+        + "&".join(
+            f"cast={FIRST_NAMES[i % 10]}%20{LAST_NAMES[i % 8]}%20{i}"
+            for i in (rng.randint(0, 50) for _ in range(3))
+        ),
+        None,
+    ),
+    "range_year": lambda rng, scale: (
+        "GET",
+        f"/shows/?release_year_min={rng.randint(1940, 2015)}"
+        f"&release_year_max=2021&sort_by=release_year&sort_direction=desc",
+        None,
+    ),
+    "sort_title": lambda rng, scale: (
+        "GET", f"/shows/?sort_by=title&sort_direction={rng.choice(('asc', 'desc'))}", None,
+    ),
+    "deep_page": lambda rng, scale: (
+        "GET", f"/shows/?per_page=50&page={rng.randint(1, max(1, scale // 50))}", None,
+    ),
+    "cursor_first_page": lambda rng, scale: (
+        "GET", "/shows/?sort_by=date_added&cursor=&per_page=50", None,
+    ),
+    "search": lambda rng, scale: (
+        "GET", f"/shows/?q={rng.choice(WORDS)}%20{rng.choice(WORDS)}", None,
+    ),
+    "batch_get": lambda rng, scale: (
+        "POST",
+        "/shows/batch-get",
+        # a 200 show watchlist, a few of them unknown
+        json.dumps(
+            {"show_ids": [f"s{rng.randint(1, scale + 10)}" for _ in range(200)]}
+        ).encode("UTF-8"),
+    ),
+    "suggest": lambda rng, scale: (
+        "GET", f"/shows/suggest?prefix={rng.choice(WORDS)[:rng.randint(1, 4)]}", None,
+    ),
+    "summary": lambda rng, scale: (
+        "GET",
+        "/shows/summary?group_by="
+        + rng.choice(("type,rating", "country", "listed_in", "release_year")),
+        None,
+    ),
+    "summary_live": lambda rng, scale: (
+        "GET", "/shows/summary?group_by=cast&top=20", None,
+    ),
+    "upsert": lambda rng, scale: ("POST", "/shows/bulk", _bulk_body(rng)),
+}
+
+MIXES = {
+    "browse": {
+        "list": 10, "filter_type_rating": 20, "filter_country_genre": 15,
+        "filter_cast_any": 10, "range_year": 10, "sort_title": 10, "deep_page": 5,
+        "cursor_first_page": 5, "search": 10, "summary": 5,
+    },
+    "summary": {"summary": 80, "summary_live": 20},
+    "write_heavy": {"list": 30, "filter_type_rating": 30, "summary": 20, "upsert": 20},
+    "all": {kind: 1 for kind in REQUESTS},
+}
+
+_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def _in_process_client():
+    from main import app
+
+    _client = app.test_client()
+
+    def _send(method, path, body):
+        _response = _client.open(
+            path, method=method, data=body, content_type="application/json"
+        )
+        return _response.status_code, _response.headers.get("Server-Timing", "")
+
+    return _send
+
+
+def _http_client(base_url:str):
+    def _send(method, path, body):
+        _request = urllib.request.Request(
+            base_url.rstrip("/") + path,
+            data=body,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(_request) as _response:
+                _response.read()
+                return _response.status, _response.headers.get("Server-Timing", "")
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get("Server-Timing", "")
+
+    return _send
+
+
+def percentile(values:list, fraction:float) -> float:
+    """Nearest rank percentile of already sorted `values`."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def run(send, mix:dict, requests:int, concurrency:int, scale:int) -> dict:
+    _kinds = list(mix)
+    _weights = [mix[k] for k in _kinds]
+    # every worker draws its own deterministic request sequence
+    _samples = {kind: [] for kind in _kinds}
+    _lock = threading.Lock()
+    _per_worker = [requests // concurrency] * concurrency
+    _per_worker[0] += requests % concurrency
+
+    def _worker(worker_id:int, count:int):
+        _rng = random.Random(SEED + worker_id)
+        _local = []
+        for _ in range(count):
+            _kind = _rng.choices(_kinds, _weights)[0]
+            _method, _path, _body = REQUESTS[_kind](_rng, scale)
+            _started = time.perf_counter()
+            _status, _timing = send(_method, _path, _body)
+            _elapsed = time.perf_counter() - _started
+            _queries = _QUERIES_RE.search(_timing)
+            _local.append(
+                (_kind, _elapsed, _status, int(_queries.group(1)) if _queries else None)
+            )
+        with _lock:
+            for _kind, _elapsed, _status, _queries in _local:
+                _samples[_kind].append((_elapsed, _status, _queries))
+
+    _started = time.perf_counter()
+    _threads = [
+        threading.Thread(target=_worker, args=(i, n)) for i, n in enumerate(_per_worker)
+    ]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    _wall = time.perf_counter() - _started
+
+    _results = {"wall_seconds": _wall, "throughput": requests / _wall, "kinds": {}}
+    for _kind, _kind_samples in _samples.items():
+        if not _kind_samples:
+            continue
+        _latencies = sorted(s[0] * 1000 for s in _kind_samples)
+        _queries = [s[2] for s in _kind_samples if s[2] is not None]
+        _results["kinds"][_kind] = {
+            "requests": len(_kind_samples),
+            "errors": sum(1 for s in _kind_samples if s[1] >= 400),
+            "p50_ms": percentile(_latencies, 0.50),
+            "p95_ms": percentile(_latencies, 0.95),
+            "p99_ms": percentile(_latencies, 0.99),
+            "mean_queries": statistics.mean(_queries) if _queries else None,
+        }
+    return _results
+
+
+def report(results:dict, baseline:dict=None, tolerance:float=0.1) -> list:
+    """Print the results, returning the regressions against `baseline`."""
+    _regressions = []
+    print(
+        f"\n{results['throughput']:,.1f} requests/s over {results['wall_seconds']:.1f}s\n"
+    )
+    print(
+        f"{'kind':<22}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'queries':>9}"
+    )
+    for _kind, _stats in sorted(results["kinds"].items()):
+        _line = (
+            f"{_kind:<22}{_stats['requests']:>6}{_stats['errors']:>5}"
+            f"{_stats['p50_ms']:>10.2f}{_stats['p95_ms']:>10.2f}{_stats['p99_ms']:>10.2f}"
+            f"{_stats['mean_queries'] if _stats['mean_queries'] is not None else '-':>9}"
+        )
+        _base = (baseline or {}).get("kinds", {}).get(_kind)
+        if _base:
+            _changes = []
+            for _key in ("p50_ms", "p95_ms", "p99_ms"):
+                _change = (_stats[_key] - _base[_key]) / _base[_key] if _base[_key] else 0
+                _changes.append(f"{_change:+.0%}")
+                if _change > tolerance:
+                    _regressions.append(f"{_kind} {_key} {_change:+.0%}")
+            _line += "   vs baseline " + " ".join(_changes)
+        print(_line)
+    return _regressions
+
+
+if __name__ == "__main__":
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument("--scale", type=int, default=10000, help="shows to seed")
+    _parser.add_argument("--reseed", action="store_true")
+    _parser.add_argument("--mix", choices=sorted(MIXES), default="browse")
+    _parser.add_argument("--requests", type=int, default=2000)
+    _parser.add_argument(
+        "--warmup", type=int, default=100, help="requests run first and not measured"
+    )
+    _parser.add_argument("--concurrency", type=int, default=8)
+    _parser.add_argument("--url", help="benchmark a running server instead")
+    _parser.add_argument(
+        "--cache", action="store_true", help="keep the response cache enabled"
+    )
+    _parser.add_argument("--baseline", help="json results to compare against")
+    _parser.add_argument("--save-baseline", help="write the results as json")
+    _parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="allowed slowdown, 0.1 = 10%%"
+    )
+    _args = _parser.parse_args()
+
+    if _args.url:
+        _send = _http_client(_args.url)
+    else:
+        os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.db")
+        if not _args.cache:
+            # measure the handlers, not cache hits
+            os.environ["CACHE_MAX_ENTRIES"] = "0"
+        seed(_args.scale, _args.reseed)
+        _send = _in_process_client()
+
+    if _args.warmup:
+        run(_send, MIXES[_args.mix], _args.warmup, _args.concurrency, _args.scale)
+    _results = run(
+        _send, MIXES[_args.mix], _args.requests, _args.concurrency, _args.scale
+    )
+    _results.update({"mix": _args.mix, "scale": _args.scale})
+    _baseline = None
+    if _args.baseline:
+        with open(_args.baseline, encoding="UTF-8") as _file:
+            _baseline = json.load(_file)
+        if (_baseline.get("mix"), _baseline.get("scale")) != (_args.mix, _args.scale):
+            print(
+                f"warning: the baseline ran mix {_baseline.get('mix')} at scale "
+                f"{_baseline.get('scale')}, the numbers are not comparable"
+            )
+    _regressions = report(_results, _baseline, _args.tolerance)
+    if _args.save_baseline:
+        with open(_args.save_baseline, "w", encoding="UTF-8") as _file:
+            json.dump(_results, _file, indent=2)
+    if _regressions:
+        print("\nregressed: " + ", ".join(_regressions))
+        sys.exit(1)
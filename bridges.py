@@ -0,0 +1,182 @@
+"""Normalized people, genre and country tables alongside the array columns.
+
+The array columns stay the source of truth and are still what the API
+returns. Every write rebuilds the links of the shows it touched:
+
+    people    (person_id, name)   show_people    (show_id, person_id, role)
+    genres    (genre_id, name)    show_genres    (show_id, genre_id)
+    countries (country_id, name)  show_countries (show_id, country_id)
+
+Both sides of every bridge are indexed, so "the shows of X" is an index
+lookup of X's id followed by a semi-join on show_id instead of a scan of the
+arrays. The same names are used by `wrangling` for its csv output.
+"""
+import sqlalchemy
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db_types import unnest
+
+# array column -> (entity table, bridge table, id column, role in show_people)
+BRIDGES = {
+    "director": ("people", "show_people", "person_id", "director"),
+    "cast": ("people", "show_people", "person_id", "cast"),
+    "country": ("countries", "show_countries", "country_id", None),
+    "listed_in": ("genres", "show_genres", "genre_id", None),
+}
+ROLES = ("director", "cast")
+
+
+def define_bridge_tables(metadata, model) -> dict:
+    """Declare the entity and bridge tables, keyed by table name."""
+    _show_id = model.__table__.c.show_id
+    _tables = {}
+    for _entity, _bridge, _id, _role in BRIDGES.values():
+        if _entity in _tables:
+            continue
+        _tables[_entity] = sqlalchemy.Table(
+            _entity,
+            metadata,
+            sqlalchemy.Column(_id, sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.Column("name", sqlalchemy.Text(), nullable=False, unique=True),
+        )
+        _columns = [
+            sqlalchemy.Column(
+                "show_id",
+                sqlalchemy.Text(),
+                sqlalchemy.ForeignKey(_show_id, ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sqlalchemy.Column(
+                _id,
+                sqlalchemy.Integer,
+                sqlalchemy.ForeignKey(_tables[_entity].c[_id]),
+                primary_key=True,
+            ),
+        ]
+        _index = [_id]
+        if _role is not None:
+            _columns.append(
+                sqlalchemy.Column("role", sqlalchemy.Text(), primary_key=True)
+            )
+            _index.append("role")
+        _tables[_bridge] = sqlalchemy.Table(
+            _bridge,
+            metadata,
+            *_columns,
+            # the entity side, the primary key covers the show side
+            sqlalchemy.Index(f"{_bridge}_{_id}_idx", *_index, "show_id"),
+        )
+    return _tables
+
+
+def _insert(dialect_name:str, table):
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def refresh_bridges(session, model, tables:dict, show_ids:list=None):
+    """Rebuild the links of `show_ids` (every show if None) from their arrays.
+
+    Call before committing a write, like `summary.refresh_summaries`.
+    """
+    session.flush()
+    _dialect_name = session.connection().dialect.name
+    _shows = model.__table__
+    for _column, (_entity, _bridge, _id, _role) in BRIDGES.items():
+        _entity_table, _bridge_table = tables[_entity], tables[_bridge]
+        _elements = unnest(_shows.c[_column], _dialect_name)
+        _source = (
+            sqlalchemy.select(_shows.c.show_id, _elements.c.value.label("name"))
+            .select_from(_shows.join(_elements, sqlalchemy.true()))
+            # sqlite needs a WHERE to parse INSERT ... SELECT ... ON CONFLICT
+            .where(_elements.c.value.isnot(None))
+        )
+        if show_ids is not None:
+            _source = _source.where(_shows.c.show_id.in_(show_ids))
+        _source = _source.subquery()
+
+        # names seen for the first time
+        _new_names = _insert(_dialect_name, _entity_table).from_select(
+            ["name"],
+            sqlalchemy.select(_source.c.name)
+            .distinct()
+            .where(_source.c.name.isnot(None)),
+        )
+        session.execute(
+            _new_names.on_conflict_do_nothing(index_elements=["name"])
+        )
+
+        _delete = _bridge_table.delete()
+        if _role is not None:
+            _delete = _delete.where(_bridge_table.c.role == _role)
+        if show_ids is not None:
+            _delete = _delete.where(_bridge_table.c.show_id.in_(show_ids))
+        session.execute(_delete)
+
+        _links = [_source.c.show_id, _entity_table.c[_id]]
+        if _role is not None:
+            _links.append(sqlalchemy.literal(_role))
+        session.execute(
+            _bridge_table.insert().from_select(
+                [c.name for c in _bridge_table.columns],
+                sqlalchemy.select(*_links)
+                .distinct()
+                .join_from(
+                    _source, _entity_table, _entity_table.c.name == _source.c.name
+                ),
+            )
+        )
+
+
+def bridge_filter(model, tables:dict, column:str, values:list, match:str="all"):
+    """Semi-join predicate for an array column filter, like `array_filter`.
+
+    `all` keeps the shows linked to every one of the values, `any` the shows
+    linked to at least one of them.
+    """
+    _entity, _bridge, _id, _role = BRIDGES[column]
+    _entity_table, _bridge_table = tables[_entity], tables[_bridge]
+    _values = sorted(set(values))
+    _linked = (
+        sqlalchemy.select(_bridge_table.c.show_id)
+        .join(_entity_table, _entity_table.c[_id] == _bridge_table.c[_id])
+        .where(_entity_table.c.name.in_(_values))
+    )
+    if _role is not None:
+        _linked = _linked.where(_bridge_table.c.role == _role)
+    if match != "any" and len(_values) > 1:
+        _linked = _linked.group_by(_bridge_table.c.show_id).having(
+            func.count(_bridge_table.c[_id].distinct()) == len(_values)
+        )
+    return model.show_id.in_(_linked)
+
+
+def person_shows(tables:dict, name:str, role:str=None):
+    """SELECT of the show_ids `name` directed or was cast in."""
+    _people, _show_people = tables["people"], tables["show_people"]
+    _select = (
+        sqlalchemy.select(_show_people.c.show_id)
+        .join(_people, _people.c.person_id == _show_people.c.person_id)
+        .where(_people.c.name == name)
+    )
+    if role is not None:
+        _select = _select.where(_show_people.c.role == role)
+    return _select
+
+
+def top_people(tables:dict, role:str=None, top:int=10):
+    """SELECT of the people in the most shows, with their show counts."""
+    _people, _show_people = tables["people"], tables["show_people"]
+    _shows = func.count(_show_people.c.show_id.distinct()).label("shows")
+    _select = (
+        sqlalchemy.select(_people.c.name, _shows)
+        .join(_show_people, _show_people.c.person_id == _people.c.person_id)
+        .group_by(_people.c.person_id, _people.c.name)
+        .order_by(_shows.desc(), _people.c.name)
+        .limit(top)
+    )
+    if role is not None:
+        _select = _select.where(_show_people.c.role == role)
+    return _select
@@ -0,0 +1,148 @@
+"""Batched upserts for POST /shows/bulk.
+
+Rows are validated a batch at a time and every batch is written with an
+INSERT ... ON CONFLICT (show_id) DO UPDATE per set of supplied columns,
+usually just one, so a catalog refresh costs a round trip per batch instead
+of a SELECT and a write per show. Only the columns a row supplies are
+written: an update that leaves out `cast` keeps the stored cast.
+"""
+import datetime
+import json
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
+
+from durations import DURATION_COLUMNS, parse_duration
+
+BATCH_SIZE = 500
+
+REQUIRED_COLUMNS = (
+    "show_id",
+    "type",
+    "title",
+    "date_added",
+    "release_year",
+    "rating",
+    "duration",
+    "description",
+)
+ARRAY_COLUMNS = ("director", "cast", "country", "listed_in")
+TEXT_COLUMNS = ("type", "title", "rating", "duration", "description")
+
+
+def iter_json_rows(request):
+    """Yield rows from a JSON array body or an NDJSON stream, one object per line."""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        for _line in request.stream:
+            _line = _line.strip()
+            if _line:
+                try:
+                    yield json.loads(_line)
+                except ValueError as error:
+                    yield error
+        return
+    _content = request.get_json(force=True)
+    if not isinstance(_content, list):
+        raise ValueError("expected a JSON array of shows")
+    yield from _content
+
+
+def batched(rows, size:int=BATCH_SIZE):
+    _batch = []
+    for _row in rows:
+        _batch.append(_row)
+        if len(_batch) >= size:
+            yield _batch
+            _batch = []
+    if _batch:
+        yield _batch
+
+
+def validate_row(row, columns) -> dict:
+    """Return the supplied `columns` of the row, raising ValueError if invalid."""
+    if isinstance(row, Exception):
+        raise ValueError(f"invalid JSON: {row}")
+    if not isinstance(row, dict):
+        raise ValueError("expected a JSON object")
+    _missing = [c for c in REQUIRED_COLUMNS if row.get(c) in (None, "")]
+    if _missing:
+        raise ValueError(f"missing {', '.join(_missing)}")
+    _row = {key: row[key] for key in columns if key in row}
+    _show_id = _row["show_id"]
+    if not isinstance(_show_id, (str, int)) or isinstance(_show_id, bool):
+        raise ValueError("show_id must be a string")
+    _row["show_id"] = str(_show_id)
+    for _column in TEXT_COLUMNS:
+        if _column in _row and not isinstance(_row[_column], str):
+            raise ValueError(f"{_column} must be a string")
+    # Convert input string to python date object
+    if isinstance(_row["date_added"], str):
+        _row["date_added"] = datetime.datetime.strptime(
+            _row["date_added"], "%Y-%m-%d"
+        ).date()
+    elif not isinstance(_row["date_added"], datetime.date):
+        raise ValueError("date_added must be a YYYY-MM-DD string")
+    if isinstance(_row["release_year"], (bool, float)):
+        raise ValueError("release_year must be an integer")
+    _row["release_year"] = int(_row["release_year"])
+    if all(c in columns for c in DURATION_COLUMNS):
+        _row["duration_minutes"], _row["seasons"] = parse_duration(_row["duration"])
+    for _column in ARRAY_COLUMNS:
+        if _row.get(_column) is not None and (
+            not isinstance(_row[_column], list)
+            or not all(isinstance(v, str) for v in _row[_column])
+        ):
+            raise ValueError(f"{_column} must be a list of strings")
+    return _row
+
+
+def upsert_batch(connection, table, rows:list) -> dict:
+    """Upsert `rows`, returning {show_id: inserted?}.
+
+    Rows supplying the same columns share a statement, which writes just
+    those columns. The show_ids must be unique.
+    """
+    _groups = {}
+    for _row in rows:
+        _groups.setdefault(frozenset(_row), []).append(_row)
+    _inserted = {}
+    for _rows in _groups.values():
+        _inserted.update(_upsert(connection, table, _rows))
+    return _inserted
+
+
+def _upsert(connection, table, rows:list) -> dict:
+    _dialect_name = connection.dialect.name
+    if _dialect_name == "postgresql":
+        _insert = postgresql.insert(table).values(rows)
+    elif _dialect_name == "sqlite":
+        _insert = sqlite.insert(table).values(rows)
+    else:
+        raise NotImplementedError(f"upsert is not supported on {_dialect_name}")
+    _statement = _insert.on_conflict_do_update(
+        index_elements=[table.c.show_id],
+        set_={
+            c.name: _insert.excluded[c.name]
+            for c in table.columns
+            if c.name in rows[0] and c.name != "show_id"
+        },
+    )
+    _show_ids = [row["show_id"] for row in rows]
+
+    if _dialect_name == "postgresql":
+        # xmax is 0 for a freshly inserted tuple and set for an updated one
+        _statement = _statement.returning(
+            table.c.show_id,
+            sqlalchemy.literal_column("(xmax = 0)").label("inserted"),
+        )
+        return {row.show_id: row.inserted for row in connection.execute(_statement)}
+
+    # sqlite can't RETURNING here, look up the existing ids in the same transaction
+    _existing = {
+        row.show_id
+        for row in connection.execute(
+            sqlalchemy.select(table.c.show_id).where(table.c.show_id.in_(_show_ids))
+        )
+    }
+    connection.execute(_statement)
+    return {show_id: show_id not in _existing for show_id in _show_ids}
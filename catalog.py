@@ -0,0 +1,345 @@
+"""Read-only, in-process copy of the catalog for the read endpoints.
+
+The whole catalog is a few thousand shows, so GET /shows/ and
+GET /shows/summary can be answered from memory instead of a database round
+trip:
+
+- values are kept column by column, strings interned and arrays as tuples
+- the text and array columns have inverted indexes, value -> row positions
+- every scalar column has a sorted index, row positions in (value, show_id)
+  order, which serves sorting, keyset pagination and range filters
+
+Enable it with CATALOG_BACKEND=memory. It loads from the database, or from a
+netflix_titles.csv when CATALOG_SOURCE is a path, which needs no database at
+all (and never sees writes). Writes through the API invalidate it, and
+CATALOG_REFRESH_SECONDS reloads it in the background to pick up writes made
+by other instances.
+
+Text is sorted by code point, like COLLATE "C". Postgres sorts by the
+database's collation (en_US.UTF-8 on Cloud SQL), which orders case and
+accents differently, so sorting mixed-case text by title, say, can page
+differently between the two backends. NULLs go last ascending and first
+descending on both.
+"""
+import bisect
+import collections
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+import sqlalchemy
+
+logger = logging.getLogger(__name__)
+
+ARRAY_COLUMNS = ("director", "cast", "country", "listed_in")
+# text columns filtered by case insensitive equality, see main.text_filter
+TEXT_INDEX_COLUMNS = ("show_id", "type", "title", "rating", "duration")
+# `q` matches whole words of these, a title match ranks above a description one
+SEARCH_WEIGHTS = {"title": 2, "description": 1}
+_WORD_RE = re.compile(r"\w+")
+
+
+def like_pattern(pattern:str):
+    """Compile an ILIKE pattern, `%` and `_` wildcards, for `fullmatch`."""
+    _regex = "".join(
+        ".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern
+    )
+    return re.compile(_regex, re.IGNORECASE | re.DOTALL)
+
+
+def _words(text) -> set:
+    return set(_WORD_RE.findall(text.lower())) if text else set()
+
+
+def _compact(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(sys.intern(v) for v in value)
+    return value
+
+
+class Catalog:
+    """Immutable snapshot of the shows, positions are in show_id order."""
+
+    def __init__(self, columns:list, rows):
+        _rows = sorted(rows, key=lambda row: row["show_id"])
+        self.size = len(_rows)
+        self.columns = {c: [_compact(row.get(c)) for row in _rows] for c in columns}
+        self.show_ids = self.columns["show_id"]
+
+        # lowercased value -> positions; array elements are kept as is since
+        # the database's array containment is case sensitive
+        self.value_index = {}
+        for _column in TEXT_INDEX_COLUMNS:
+            _index = collections.defaultdict(set)
+            for _position, _value in enumerate(self.columns[_column]):
+                if _value is not None:
+                    _index[_value.lower()].add(_position)
+            self.value_index[_column] = dict(_index)
+        for _column in ARRAY_COLUMNS:
+            _index = collections.defaultdict(set)
+            for _position, _values in enumerate(self.columns[_column]):
+                for _value in _values or ():
+                    _index[_value].add(_position)
+            self.value_index[_column] = dict(_index)
+
+        self.word_index = {}
+        for _column in SEARCH_WEIGHTS:
+            _index = collections.defaultdict(set)
+            for _position, _text in enumerate(self.columns[_column]):
+                for _word in _words(_text):
+                    _index[_word].add(_position)
+            self.word_index[_column] = dict(_index)
+
+        # column -> (positions, values of the non NULL positions); a stable
+        # sort of show_id ordered positions leaves ties in show_id order, and
+        # NULLs go last like they do in a postgres ascending sort
+        self.sorted_index = {}
+        for _column in columns:
+            if _column in ARRAY_COLUMNS:
+                continue
+            _values = self.columns[_column]
+            _present = [p for p in range(self.size) if _values[p] is not None]
+            _present.sort(key=_values.__getitem__)
+            _nulls = [p for p in range(self.size) if _values[p] is None]
+            self.sorted_index[_column] = (
+                _present + _nulls,
+                [_values[p] for p in _present],
+            )
+
+    @classmethod
+    def from_database(cls, engine, table):
+        with engine.connect() as _connection:
+            _rows = [
+                dict(row._mapping)
+                for row in _connection.execute(sqlalchemy.select(table))
+            ]
+        return cls([c.name for c in table.columns], _rows)
+
+    @classmethod
+    def from_csv(cls, path:str, columns:list):
+        # pandas is only needed when serving straight from the csv
+        from wrangling import clean_shows, read_titles
+
+        _rows = []
+        for _chunk in read_titles(path):
+            _shows = clean_shows(_chunk)
+            _shows = _shows[_shows["show_id"].notna()][list(columns)].astype(object)
+            _rows.extend(_shows.where(_shows.notna(), None).to_dict("records"))
+        return cls(columns, _rows)
+
+    def _scan(self, column:str, regex) -> set:
+        return {
+            p
+            for p, v in enumerate(self.columns[column])
+            if v is not None and regex.fullmatch(str(v))
+        }
+
+    def _range(self, column:str, low, high) -> set:
+        """Positions with low <= value < high, either end may be None."""
+        _positions, _values = self.sorted_index[column]
+        _start = 0 if low is None else bisect.bisect_left(_values, low)
+        _end = len(_values) if high is None else bisect.bisect_left(_values, high)
+        return set(_positions[_start:_end])
+
+    def match(self, filters:dict) -> tuple:
+        """Apply `main.parse_show_filters` output.
+
+        Returns (matching positions or None for every show, rank by position
+        when `q` was given or None).
+        """
+        _sets = []
+        for _column, _value in filters["text"].items():
+            if "%" in _value or "_" in _value:
+                _sets.append(self._scan(_column, like_pattern(_value)))
+            else:
+                _sets.append(self.value_index[_column].get(_value.lower(), set()))
+        for _column, _values in filters["arrays"].items():
+            _index = self.value_index[_column]
+            _matches = [_index.get(v, set()) for v in _values]
+            if filters["match"] == "any":
+                _sets.append(set().union(*_matches))
+            else:
+                _sets.append(set.intersection(*_matches))
+        for _column, (_low, _high) in filters["ranges"].items():
+            _sets.append(self._range(_column, _low, _high))
+        if filters["description"]:
+            _sets.append(self._scan("description", like_pattern(filters["description"])))
+
+        _rank = None
+        if filters["q"]:
+            _rank = collections.Counter()
+            _terms = _words(filters["q"])
+            # every term has to be in the title or the description
+            _found = None
+            for _term in _terms:
+                _term_found = set()
+                for _column, _weight in SEARCH_WEIGHTS.items():
+                    for _position in self.word_index[_column].get(_term, ()):
+                        _rank[_position] += _weight
+                        _term_found.add(_position)
+                _found = _term_found if _found is None else _found & _term_found
+            _sets.append(_found or set())
+
+        if not _sets:
+            return None, _rank
+        # intersect starting from the smallest set
+        _sets.sort(key=len)
+        return set.intersection(*_sets), _rank
+
+    def ordered(self, matched, sort_by:str, sort_direction:str, rank=None) -> list:
+        """Matching positions by rank, or by (sort_by, show_id)."""
+        if rank is not None:
+            _matched = range(self.size) if matched is None else matched
+            return sorted(_matched, key=lambda p: (-rank[p], p))
+        if sort_by not in self.sorted_index:
+            sort_by = "show_id"
+        _positions, _ = self.sorted_index[sort_by]
+        # descending is the exact reverse, NULLs first like postgres
+        _ordered = _positions if sort_direction == "asc" else reversed(_positions)
+        if matched is None:
+            return list(_ordered)
+        return [p for p in _ordered if p in matched]
+
+    def seek(self, matched, sort_by:str, sort_direction:str, after, limit:int) -> list:
+        """Up to `limit` matching positions after the (value, show_id) key `after`.
+
+        `sort_by` must be a column without NULLs, see main.KEYSET_SORT_COLUMNS.
+        """
+        _positions, _values = self.sorted_index[sort_by]
+        if sort_direction == "asc":
+            _start = 0
+            if after is not None:
+                # skip the smaller values, then the ties up to the show_id
+                _value, _show_id = after
+                _low = bisect.bisect_left(_values, _value)
+                _high = bisect.bisect_right(_values, _value)
+                _first = bisect.bisect_right(self.show_ids, _show_id)
+                _start = bisect.bisect_left(_positions, _first, _low, _high)
+            _candidates = (_positions[i] for i in range(_start, len(_values)))
+        else:
+            _end = len(_values)
+            if after is not None:
+                _value, _show_id = after
+                _low = bisect.bisect_left(_values, _value)
+                _high = bisect.bisect_right(_values, _value)
+                _first = bisect.bisect_left(self.show_ids, _show_id)
+                _end = bisect.bisect_left(_positions, _first, _low, _high)
+            _candidates = (_positions[i] for i in range(_end - 1, -1, -1))
+        if matched is not None:
+            _candidates = (p for p in _candidates if p in matched)
+        return list(itertools.islice(_candidates, limit))
+
+    def lookup(self, show_ids) -> dict:
+        """show_id -> position for the `show_ids` in the catalog."""
+        _positions = {}
+        for _show_id in show_ids:
+            _position = bisect.bisect_left(self.show_ids, _show_id)
+            if _position < self.size and self.show_ids[_position] == _show_id:
+                _positions[_show_id] = _position
+        return _positions
+
+    def rows(self, positions, fields:list) -> list:
+        _columns = [self.columns[f] for f in fields]
+        return [
+            dict(zip(fields, [_column[p] for _column in _columns]))
+            for p in positions
+        ]
+
+    def summary(self, group_by:list, filter_column:str=None, filter_value:str=None, top:int=None) -> list:
+        """Counts per group like `summary.summary_select`, arrays by element."""
+        _matched = range(self.size)
+        if filter_column is not None:
+            if filter_column in ARRAY_COLUMNS:
+                _matched = sorted(self.value_index[filter_column].get(filter_value, ()))
+            else:
+                # the database filter is a case sensitive LIKE '%value%'
+                _values = self.columns[filter_column]
+                _matched = [
+                    p
+                    for p in _matched
+                    if _values[p] is not None and filter_value in str(_values[p])
+                ]
+
+        _counts = collections.Counter()
+        _columns = [(c in ARRAY_COLUMNS, self.columns[c]) for c in group_by]
+        for _position in _matched:
+            # a show counts once per distinct element of an array column
+            _keys = [
+                set(_values[_position] or ()) if _is_array else (_values[_position],)
+                for _is_array, _values in _columns
+            ]
+            _counts.update(itertools.product(*_keys))
+        return [
+            {**dict(zip(group_by, _key)), "count": _count}
+            for _key, _count in _counts.most_common(top or None)
+        ]
+
+
+class CatalogStore:
+    """Holds the current Catalog, loading a new one after invalidation."""
+
+    def __init__(self, load, refresh_interval:float=0):
+        self._load = load
+        self._catalog = None
+        # bumped by every invalidation, a load that raced one isn't kept
+        self._version = 0
+        self._lock = threading.Lock()
+        if refresh_interval > 0:
+            threading.Thread(
+                target=self._refresh_every, args=(refresh_interval,), daemon=True
+            ).start()
+
+    def get(self) -> Catalog:
+        _catalog = self._catalog
+        if _catalog is not None:
+            return _catalog
+        with self._lock:
+            if self._catalog is not None:
+                return self._catalog
+            _version = self._version
+            _catalog = self._load()
+            if _version == self._version:
+                self._catalog = _catalog
+            return _catalog
+
+    def invalidate(self):
+        """Call after every write, the next read loads a fresh catalog."""
+        self._version += 1
+        self._catalog = None
+
+    def refresh(self):
+        _version = self._version
+        _catalog = self._load()
+        with self._lock:
+            if _version == self._version:
+                self._catalog = _catalog
+
+    def _refresh_every(self, interval:float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:
+                # keep serving the current catalog, the next interval retries
+                logger.exception("catalog refresh failed")
+
+
+def store_from_env(engine, table):
+    """The CatalogStore selected by CATALOG_BACKEND, None for the database."""
+    if os.environ.get("CATALOG_BACKEND", "database").lower() != "memory":
+        return None
+    _source = os.environ.get("CATALOG_SOURCE", "database")
+    if _source == "database":
+        _load = lambda: Catalog.from_database(engine, table)
+    else:
+        _columns = [c.name for c in table.columns]
+        _load = lambda: Catalog.from_csv(_source, _columns)
+    return CatalogStore(
+        _load, refresh_interval=float(os.environ.get("CATALOG_REFRESH_SECONDS", 0))
+    )
@@ -0,0 +1,130 @@
+"""gzip and brotli compression of responses, negotiated with Accept-Encoding.
+
+    COMPRESS_MIN_BYTES  smallest body worth compressing (default 1024)
+    GZIP_LEVEL          zlib level, 1-9 (default 6)
+    BROTLI_QUALITY      brotli quality, 0-11 (default 5)
+
+Brotli is used when the `brotli` package is installed and the client accepts
+it, gzip otherwise. Buffered bodies are compressed whole; streamed ones, like
+the exports, are compressed as they are sent. A compressed response keeps
+its ETag as a weak one, since the bytes differ per encoding.
+"""
+import os
+import zlib
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+from metrics import timed
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/msgpack",
+    "application/x-msgpack",
+}
+
+
+def _compressible(mimetype:str) -> bool:
+    return (
+        mimetype in COMPRESSIBLE_MIMETYPES
+        or mimetype.startswith("text/")
+        or mimetype.endswith("+json")
+    )
+
+
+def _compressor(encoding:str, gzip_level:int, brotli_quality:int):
+    """(compress(chunk) -> bytes, finish() -> bytes) for one response."""
+    if encoding == "br":
+        _brotli = brotli.Compressor(quality=brotli_quality)
+        return _brotli.process, _brotli.finish
+    # wbits 31 is the gzip container
+    _gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    return _gzip.compress, _gzip.flush
+
+
+def _compressed_stream(chunks, compress, finish):
+    try:
+        for _chunk in chunks:
+            if isinstance(_chunk, str):
+                _chunk = _chunk.encode("UTF-8")
+            _compressed = compress(_chunk)
+            if _compressed:
+                yield _compressed
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class Compression:
+    def __init__(self, min_bytes:int=1024, gzip_level:int=6, brotli_quality:int=5):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = (["br"] if brotli is not None else []) + ["gzip"]
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            min_bytes=int(os.environ.get("COMPRESS_MIN_BYTES", 1024)),
+            gzip_level=int(os.environ.get("GZIP_LEVEL", 6)),
+            brotli_quality=int(os.environ.get("BROTLI_QUALITY", 5)),
+        )
+
+    def compress_body(self, body:bytes, mimetype:str, accept_encoding:str) -> tuple:
+        """(body, encoding) of a buffered response outside Flask, see asgi.py.
+
+        The encoding is None when the body is sent as is.
+        """
+        if len(body) < self.min_bytes or not _compressible(mimetype):
+            return body, None
+        _encoding = parse_accept_header(accept_encoding).best_match(self.encodings)
+        if _encoding is None:
+            return body, None
+        _compress, _finish = _compressor(
+            _encoding, self.gzip_level, self.brotli_quality
+        )
+        with timed("serialize"):
+            return _compress(body) + _finish(), _encoding
+
+    def init_app(self, app):
+        app.after_request(self.compress)
+
+    def compress(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not _compressible(response.mimetype or "")
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        _encoding = request.accept_encodings.best_match(self.encodings)
+        if _encoding is None:
+            return response
+        _compress, _finish = _compressor(
+            _encoding, self.gzip_level, self.brotli_quality
+        )
+
+        if response.is_streamed:
+            response.response = _compressed_stream(response.response, _compress, _finish)
+            response.headers.pop("Content-Length", None)
+        else:
+            _body = response.get_data()
+            if len(_body) < self.min_bytes:
+                return response
+            with timed("serialize"):
+                response.set_data(_compress(_body) + _finish())
+
+        response.headers["Content-Encoding"] = _encoding
+        _etag, _weak = response.get_etag()
+        if _etag and not _weak:
+            response.set_etag(_etag, weak=True)
+        return response
@@ -0,0 +1,158 @@
+"""Database credential providers.
+
+Secrets are fetched through a pluggable backend and held in a TTL cache so
+that opening a new pooled connection does not cost a Secret Manager round
+trip per credential.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROJECT_ID = "theta-messenger-334101"
+DEFAULT_TTL = 300.0
+
+
+class SecretManagerBackend:
+    """Fetch secrets from GCP Secret Manager using one shared client."""
+
+    def __init__(self, project_id:str=None):
+        self.project_id = project_id or os.environ.get(
+            "GCP_PROJECT", DEFAULT_PROJECT_ID
+        )
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # building a client is expensive (grpc channel + auth), only do it once
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google.cloud import secretmanager
+
+                    self._client = secretmanager.SecretManagerServiceClient()
+        return self._client
+
+    def fetch(self, secret_id:str, version_id:str="latest") -> str:
+        # Build the resource name of the secret version.
+        _name = f"projects/{self.project_id}/secrets/{secret_id}/versions/{version_id}"
+        _response = self.client.access_secret_version(name=_name)
+        return _response.payload.data.decode("UTF-8")
+
+
+class EnvBackend:
+    """Read secrets from environment variables, e.g. `DB_USER`."""
+
+    def __init__(self, prefix:str=""):
+        self.prefix = prefix
+
+    def fetch(self, secret_id:str, version_id:str="latest") -> str:
+        _value = os.environ.get(f"{self.prefix}{secret_id}")
+        if _value is None:
+            raise KeyError(f"environment variable {self.prefix}{secret_id} is not set")
+        return _value
+
+
+class FileBackend:
+    """Read secrets from a local JSON object file, a stand-in for Secret Manager.
+
+    The file is re-read on every fetch so an edited file acts like a rotated
+    secret once the cache entry expires.
+    """
+
+    def __init__(self, path:str):
+        self.path = path
+
+    def fetch(self, secret_id:str, version_id:str="latest") -> str:
+        with open(self.path, encoding="UTF-8") as _file:
+            _secrets = json.load(_file)
+        if secret_id not in _secrets:
+            raise KeyError(f"{secret_id} not found in {self.path}")
+        return str(_secrets[secret_id])
+
+
+class CachedCredentialProvider:
+    """TTL cache in front of a secret backend.
+
+    `refresh_ahead` is the number of seconds before expiry in which a read
+    still returns the cached value but kicks off a background refresh, so
+    hot paths never block on the backend once warmed.
+    """
+
+    def __init__(self, backend, ttl:float=DEFAULT_TTL, refresh_ahead:float=0.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        # (secret_id, version_id) -> (value, expires_at)
+        self._cache = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, secret_id:str, version_id:str="latest") -> str:
+        _key = (secret_id, version_id)
+        _entry = self._cache.get(_key)
+        if _entry is not None:
+            _value, _expires_at = _entry
+            _remaining = _expires_at - time.monotonic()
+            if _remaining > 0:
+                if _remaining <= self.refresh_ahead:
+                    self._refresh_in_background(_key)
+                return _value
+        return self._load(_key)
+
+    def invalidate(self, secret_id:str=None):
+        """Drop one secret (all versions) or the whole cache."""
+        with self._lock:
+            if secret_id is None:
+                self._cache.clear()
+            else:
+                for _key in [k for k in self._cache if k[0] == secret_id]:
+                    del self._cache[_key]
+
+    def _load(self, key) -> str:
+        _value = self.backend.fetch(*key)
+        with self._lock:
+            self._cache[key] = (_value, time.monotonic() + self.ttl)
+        return _value
+
+    def _refresh_in_background(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                self._load(key)
+            except Exception:
+                # keep serving the cached value, the next expiry will retry
+                logger.exception("background refresh of %s failed", key[0])
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_refresh, daemon=True).start()
+
+
+def backend_from_env():
+    """Pick a backend using `CREDENTIALS_BACKEND` (secretmanager, env or file)."""
+    _kind = os.environ.get("CREDENTIALS_BACKEND", "secretmanager").lower()
+    if _kind == "env":
+        return EnvBackend(os.environ.get("CREDENTIALS_ENV_PREFIX", ""))
+    if _kind == "file":
+        return FileBackend(os.environ.get("CREDENTIALS_FILE", "secrets.json"))
+    if _kind == "secretmanager":
+        return SecretManagerBackend()
+    raise ValueError(f"unknown CREDENTIALS_BACKEND {_kind!r}")
+
+
+def provider_from_env() -> CachedCredentialProvider:
+    return CachedCredentialProvider(
+        backend_from_env(),
+        ttl=float(os.environ.get("CREDENTIALS_TTL", DEFAULT_TTL)),
+        refresh_ahead=float(os.environ.get("CREDENTIALS_REFRESH_AHEAD", 30)),
+    )
@@ -0,0 +1,111 @@
+"""Column types that work on both postgres and the local sqlite stand-in."""
+import sqlalchemy
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+def as_list(value) -> list:
+    """Accept a single value or an iterable of values as a list of strings."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value]
+
+
+def unnest(column, dialect_name:str):
+    """Table valued expression yielding one `value` row per array element."""
+    if dialect_name == "postgresql":
+        return func.unnest(column).table_valued("value").render_derived()
+    return func.json_each(column).table_valued("value")
+
+
+def equals_any(column, values:list, dialect_name:str):
+    """`column = ANY(:values)` on postgres, else `column IN (...)`.
+
+    The array is a single parameter, so every number of values is the same
+    statement to the server.
+    """
+    if dialect_name == "postgresql":
+        return column == sqlalchemy.any_(
+            sqlalchemy.literal(list(values), postgresql.ARRAY(column.type))
+        )
+    return column.in_(values)
+
+
+class array_contains(FunctionElement):
+    """`column @> ARRAY[values]`: the array holds every one of the values."""
+
+    type = sqlalchemy.Boolean()
+    name = "array_contains"
+    inherit_cache = True
+
+
+class array_overlap(FunctionElement):
+    """`column && ARRAY[values]`: the array holds at least one of the values."""
+
+    type = sqlalchemy.Boolean()
+    name = "array_overlap"
+    inherit_cache = True
+
+
+def _split(element, compiler, **kw):
+    _column, *_values = element.clauses
+    _values = ", ".join(compiler.process(v, **kw) for v in _values)
+    return compiler.process(_column, **kw), _values
+
+
+@compiles(array_contains, "postgresql")
+def _pg_array_contains(element, compiler, **kw):
+    _column, _values = _split(element, compiler, **kw)
+    return f"{_column} @> CAST(ARRAY[{_values}] AS TEXT[])"
+
+
+@compiles(array_overlap, "postgresql")
+def _pg_array_overlap(element, compiler, **kw):
+    _column, _values = _split(element, compiler, **kw)
+    return f"{_column} && CAST(ARRAY[{_values}] AS TEXT[])"
+
+
+# everything that is not postgres stores the array as a JSON list
+@compiles(array_contains)
+def _json_array_contains(element, compiler, **kw):
+    _column, _values = _split(element, compiler, **kw)
+    _count = len(element.clauses) - 1
+    return (
+        f"(SELECT count(DISTINCT value) FROM json_each({_column}) "
+        f"WHERE value IN ({_values})) = {_count}"
+    )
+
+
+@compiles(array_overlap)
+def _json_array_overlap(element, compiler, **kw):
+    _column, _values = _split(element, compiler, **kw)
+    return f"EXISTS (SELECT 1 FROM json_each({_column}) WHERE value IN ({_values}))"
+
+
+class TextArray(sqlalchemy.types.TypeDecorator):
+    """`TEXT[]` on postgres, a JSON encoded list of strings everywhere else."""
+
+    impl = sqlalchemy.types.JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.ARRAY(sqlalchemy.Text()))
+        return dialect.type_descriptor(sqlalchemy.types.JSON(none_as_null=True))
+
+    class comparator_factory(sqlalchemy.types.TypeDecorator.Comparator):
+        def contains(self, other, **kwargs):
+            _values = [sqlalchemy.literal(v) for v in as_list(other)]
+            if not _values:
+                return sqlalchemy.true()
+            return array_contains(self.expr, *_values)
+
+        def overlap(self, other):
+            _values = [sqlalchemy.literal(v) for v in as_list(other)]
+            if not _values:
+                return sqlalchemy.false()
+            return array_overlap(self.expr, *_values)
@@ -0,0 +1,27 @@
+"""Numeric forms of the free text `duration` column.
+
+Movies are "90 min", TV shows "1 Season" / "3 Seasons". They are stored
+alongside the text as `duration_minutes` and `seasons`, so duration filters
+and sorts compare integers instead of strings.
+"""
+import re
+
+# named groups, `wrangling` runs the same pattern through Series.str.extract
+DURATION_PATTERN = r"^\s*(?P<amount>\d+)\s*(?P<unit>min|seasons?)\b"
+_DURATION_RE = re.compile(DURATION_PATTERN, re.IGNORECASE)
+# the columns derived from duration, never taken from the client
+DURATION_COLUMNS = ("duration_minutes", "seasons")
+
+
+def parse_duration(duration:str) -> tuple:
+    """Parse "90 min" -> (90, None) and "3 Seasons" -> (None, 3).
+
+    Anything else, including a missing duration, is (None, None).
+    """
+    _match = _DURATION_RE.match(duration or "")
+    if _match is None:
+        return None, None
+    _amount = int(_match.group("amount"))
+    if _match.group("unit").lower() == "min":
+        return _amount, None
+    return None, _amount
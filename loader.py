@@ -0,0 +1,146 @@
+"""Bulk load netflix_titles.csv into the shows table.
+
+    python loader.py [netflix_titles.csv] [--chunksize N]
+
+Chunks cleaned by `wrangling` are streamed into a temporary staging table,
+with COPY FROM STDIN on postgres and executemany on the sqlite stand-in
+(DATABASE_URL=sqlite:///...), then merged into the shows table with one
+INSERT ... SELECT ... ON CONFLICT (show_id) DO UPDATE.
+"""
+import argparse
+import csv
+import io
+import time
+
+import pandas
+import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
+
+from bridges import refresh_bridges
+from main import BRIDGE_TABLES, SUMMARY_TABLES, Show, db
+from summary import refresh_summaries
+from wrangling import CHUNK_SIZE, CSV_PATH, clean_shows, read_titles
+
+COLUMNS = [c.name for c in Show.__table__.columns]
+REQUIRED_COLUMNS = [c.name for c in Show.__table__.columns if not c.nullable]
+
+
+def pg_array_literal(values) -> str:
+    """['a', 'b "c"'] -> {"a","b \\"c\\""}, the text form COPY expects."""
+    _escaped = (v.replace("\\", "\\\\").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'"{v}"' for v in _escaped) + "}"
+
+
+def define_staging_table(table):
+    return sqlalchemy.Table(
+        f"{table.name}_staging",
+        sqlalchemy.MetaData(),
+        *[sqlalchemy.Column(c.name, c.type) for c in table.columns],
+        prefixes=["TEMPORARY"],
+    )
+
+
+def chunk_records(shows:pandas.DataFrame) -> list:
+    """Rows of a cleaned chunk as dicts, with every missing value as None."""
+    _shows = shows[COLUMNS].astype(object)
+    return _shows.where(_shows.notna(), None).to_dict("records")
+
+
+def copy_chunk(connection, staging, records:list):
+    """COPY the records into the staging table through the DBAPI cursor."""
+    _buffer = io.StringIO()
+    _writer = csv.writer(_buffer)
+    for _record in records:
+        _writer.writerow(
+            [
+                pg_array_literal(v) if isinstance(v, list) else v
+                for v in (_record[c] for c in COLUMNS)
+            ]
+        )
+    _buffer.seek(0)
+
+    _quote = connection.dialect.identifier_preparer.quote
+    _sql = (
+        f"COPY {_quote(staging.name)} ({', '.join(_quote(c) for c in COLUMNS)}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    _cursor = connection.connection.cursor()
+    if hasattr(_cursor, "copy_expert"):
+        # psycopg2
+        _cursor.copy_expert(_sql, _buffer)
+    else:
+        # pg8000
+        _cursor.execute(_sql, stream=_buffer)
+
+
+def merge_staging(connection, table, staging):
+    """Upsert the staged rows into `table`, the last staged row per show wins."""
+    if connection.dialect.name == "postgresql":
+        _insert = postgresql.insert(table)
+        _latest = sqlalchemy.select(staging).distinct(staging.c.show_id).order_by(
+            staging.c.show_id, sqlalchemy.literal_column("ctid").desc()
+        )
+    else:
+        _insert = sqlite.insert(table)
+        _last_rowids = (
+            sqlalchemy.select(sqlalchemy.func.max(sqlalchemy.literal_column("rowid")))
+            .select_from(staging)
+            .group_by(staging.c.show_id)
+            .correlate(None)
+        )
+        _latest = sqlalchemy.select(staging).where(
+            sqlalchemy.literal_column("rowid").in_(_last_rowids)
+        )
+    _statement = _insert.from_select(COLUMNS, _latest).on_conflict_do_update(
+        index_elements=[table.c.show_id],
+        set_={c: _insert.excluded[c] for c in COLUMNS if c != "show_id"},
+    )
+    return connection.execute(_statement).rowcount
+
+
+def load(path:str=CSV_PATH, chunksize:int=CHUNK_SIZE):
+    _started = time.perf_counter()
+    _connection = db.session.connection()
+    _table = Show.__table__
+    _staging = define_staging_table(_table)
+    _staging.create(_connection)
+
+    _loaded = _skipped = 0
+    for _chunk in read_titles(path, chunksize):
+        _chunk_started = time.perf_counter()
+        _shows = clean_shows(_chunk)
+        _valid = _shows[REQUIRED_COLUMNS].notna().all(axis=1)
+        _skipped += int((~_valid).sum())
+        _records = chunk_records(_shows[_valid])
+        if _connection.dialect.name == "postgresql":
+            copy_chunk(_connection, _staging, _records)
+        else:
+            _connection.execute(_staging.insert(), _records)
+        _loaded += len(_records)
+        _elapsed = time.perf_counter() - _chunk_started
+        print(
+            f"staged {len(_records)} rows in {_elapsed:.2f}s "
+            f"({len(_records) / _elapsed:,.0f} rows/s)"
+        )
+
+    _merge_started = time.perf_counter()
+    _merged = merge_staging(_connection, _table, _staging)
+    print(f"merged {_merged} rows in {time.perf_counter() - _merge_started:.2f}s")
+    _staging.drop(_connection)
+    refresh_bridges(db.session, Show, BRIDGE_TABLES)
+    refresh_summaries(db.session, Show, SUMMARY_TABLES)
+    db.session.commit()
+
+    _elapsed = time.perf_counter() - _started
+    print(
+        f"loaded {_loaded} rows ({_skipped} skipped for missing required values) "
+        f"in {_elapsed:.2f}s, {_loaded / _elapsed:,.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument("csv", nargs="?", default=CSV_PATH)
+    _parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    _args = _parser.parse_args()
+    load(_args.csv, _args.chunksize)
@@ -0,0 +1,226 @@
+"""Prometheus metrics and per-request timing.
+
+Every request records its database time (through SQLAlchemy cursor events),
+its serialization time and the rows it returned. These go into histograms
+served as Prometheus text from GET /metrics, and into a Server-Timing
+response header so a client can see the db vs serialize breakdown:
+
+    Server-Timing: db;dur=4.1;desc="2 queries", serialize;dur=0.6, total;dur=6.3
+
+The exposition format is simple enough to write directly, so there is no
+client library to install.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 1000, 10000)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    _pairs = ",".join(
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for n, v in zip(names, values)
+    )
+    return "{" + _pairs + "}"
+
+
+class Histogram:
+    def __init__(self, name:str, description:str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> (per bucket counts, +Inf count, sum)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value:float, *labelvalues):
+        with self._lock:
+            _counts, _count, _sum = self._series.get(
+                labelvalues, ([0] * len(self.buckets), 0, 0.0)
+            )
+            _index = bisect.bisect_left(self.buckets, value)
+            if _index < len(self.buckets):
+                _counts[_index] += 1
+            self._series[labelvalues] = (_counts, _count + 1, _sum + value)
+
+    def render(self) -> list:
+        _lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        _names = self.labelnames + ("le",)
+        with self._lock:
+            for _values, (_counts, _count, _sum) in sorted(self._series.items()):
+                _cumulative = 0
+                for _bound, _bucket_count in zip(self.buckets, _counts):
+                    _cumulative += _bucket_count
+                    _lines.append(
+                        f"{self.name}_bucket{_labels(_names, _values + (_bound,))} {_cumulative}"
+                    )
+                _lines.append(
+                    f"{self.name}_bucket{_labels(_names, _values + ('+Inf',))} {_count}"
+                )
+                _labelled = _labels(self.labelnames, _values)
+                _lines.append(f"{self.name}_sum{_labelled} {_sum}")
+                _lines.append(f"{self.name}_count{_labelled} {_count}")
+        return _lines
+
+
+class Gauges:
+    """Values read from `collect()` at scrape time, e.g. pool or cache counters.
+
+    `collect` returns {name: (type, description, value)}.
+    """
+
+    def __init__(self, collect):
+        self.collect = collect
+
+    def render(self) -> list:
+        _lines = []
+        for _name, (_type, _description, _value) in self.collect().items():
+            _lines += [f"# HELP {_name} {_description}", f"# TYPE {_name} {_type}"]
+            _lines.append(f"{_name} {_value}")
+        return _lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(l for m in self.metrics for l in m.render()) + "\n"
+
+
+registry = Registry()
+REQUEST_DURATION = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to handle a request, until the response is returned to the server",
+        ("route", "method", "status"),
+    )
+)
+DB_QUERIES = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements executed per request",
+        ("route",),
+        COUNT_BUCKETS,
+    )
+)
+DB_DURATION = registry.register(
+    Histogram(
+        "db_duration_seconds",
+        "Time per request spent executing SQL statements",
+        ("route",),
+    )
+)
+SERIALIZE_DURATION = registry.register(
+    Histogram(
+        "serialization_duration_seconds",
+        "Time per request spent encoding the response body",
+        ("route",),
+    )
+)
+RESPONSE_ROWS = registry.register(
+    Histogram(
+        "response_rows",
+        "Shows or summary groups returned per request",
+        ("route",),
+        COUNT_BUCKETS,
+    )
+)
+
+
+@contextmanager
+def timed(phase:str):
+    """Add the time spent in the block to the current request's `phase`."""
+    _started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and "timings" in g:
+            g.timings[phase] = g.timings.get(phase, 0.0) + (
+                time.perf_counter() - _started
+            )
+
+
+def add_rows(count:int):
+    if has_request_context() and "timings" in g:
+        g.rows = getattr(g, "rows", 0) + count
+
+
+def _route() -> str:
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _before_request():
+    g.timings = {"db": 0.0}
+    g.db_queries = 0
+    g.request_started = time.perf_counter()
+
+
+def _after_request(response):
+    if "timings" not in g:
+        return response
+    _total = time.perf_counter() - g.request_started
+    _route_label = _route()
+    REQUEST_DURATION.observe(
+        _total, _route_label, request.method, response.status_code
+    )
+    DB_QUERIES.observe(g.db_queries, _route_label)
+    DB_DURATION.observe(g.timings["db"], _route_label)
+    if "serialize" in g.timings:
+        SERIALIZE_DURATION.observe(g.timings["serialize"], _route_label)
+    if "rows" in g:
+        RESPONSE_ROWS.observe(g.rows, _route_label)
+
+    _timing = [f'db;dur={g.timings["db"] * 1000:.1f};desc="{g.db_queries} queries"']
+    if "serialize" in g.timings:
+        _timing.append(f'serialize;dur={g.timings["serialize"] * 1000:.1f}')
+    _timing.append(f"total;dur={_total * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(_timing)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _started = conn.info["query_started"].pop()
+    # background work (catalog refreshes, warm-up) has no request to charge
+    if has_request_context() and "timings" in g:
+        g.timings["db"] += time.perf_counter() - _started
+        g.db_queries += 1
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute doesn't run for a failed statement
+    _connection = exception_context.connection
+    if _connection is not None and _connection.info.get("query_started"):
+        _connection.info["query_started"].pop()
+
+
+def instrument(app, engine, *gauges):
+    """Time every request of `app` and every statement on `engine`, serve /metrics."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    for _gauges in gauges:
+        registry.register(_gauges)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
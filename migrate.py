@@ -0,0 +1,110 @@
+"""Apply the pending SQL migrations in migrations/ to the postgres database.
+
+    python migrate.py [--list]
+
+Each migrations/NNNN_name.sql file runs once, in file name order, inside its
+own transaction, and is recorded in netflix.schema_migrations.
+"""
+import argparse
+import os
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "migrations"
+)
+
+
+def split_statements(sql:str) -> list:
+    """Split a script on `;`, ignoring the ones in strings, comments and $$ bodies.
+
+    The driver runs one statement per call, so scripts are sent a statement
+    at a time.
+    """
+    _statements = []
+    _current = []
+    _index = 0
+    _quote = None
+    while _index < len(sql):
+        _char = sql[_index]
+        if _quote is None and sql.startswith("--", _index):
+            _end = sql.find("\n", _index)
+            _index = len(sql) if _end == -1 else _end
+            continue
+        if sql.startswith("$$", _index):
+            _quote = None if _quote == "$$" else (_quote or "$$")
+            _current.append("$$")
+            _index += 2
+            continue
+        if _char == "'" and _quote in (None, "'"):
+            _quote = None if _quote == "'" else "'"
+        if _char == ";" and _quote is None:
+            _statements.append("".join(_current).strip())
+            _current = []
+        else:
+            _current.append(_char)
+        _index += 1
+    _statements.append("".join(_current).strip())
+    return [s for s in _statements if s]
+
+
+def migration_files() -> list:
+    return sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+
+
+def applied_versions(connection) -> set:
+    connection.exec_driver_sql(
+        "create table if not exists netflix.schema_migrations "
+        "(version text primary key, applied_at timestamptz not null default now())"
+    )
+    return {
+        row[0]
+        for row in connection.exec_driver_sql(
+            "select version from netflix.schema_migrations"
+        )
+    }
+
+
+def migrate(engine) -> list:
+    """Apply every pending migration, returning the versions applied."""
+    if engine.dialect.name != "postgresql":
+        raise SystemExit(
+            "migrations are postgres only, the sqlite stand-in is created by the app"
+        )
+    with engine.begin() as _connection:
+        _applied = applied_versions(_connection)
+
+    _done = []
+    for _file in migration_files():
+        _version = _file[: -len(".sql")]
+        if _version in _applied:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, _file), encoding="UTF-8") as _sql:
+            _statements = split_statements(_sql.read())
+        with engine.begin() as _connection:
+            for _statement in _statements:
+                _connection.exec_driver_sql(_statement)
+            _connection.exec_driver_sql(
+                "insert into netflix.schema_migrations (version) values (%s)",
+                (_version,),
+            )
+        print(f"applied {_version}")
+        _done.append(_version)
+    return _done
+
+
+if __name__ == "__main__":
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument(
+        "--list", action="store_true", help="only show pending migrations"
+    )
+    _args = _parser.parse_args()
+
+    from main import db
+
+    if _args.list:
+        with db.engine.begin() as _connection:
+            _applied = applied_versions(_connection)
+        for _file in migration_files():
+            _version = _file[: -len(".sql")]
+            print(f"{'applied' if _version in _applied else 'pending'}  {_version}")
+    else:
+        migrate(db.engine)
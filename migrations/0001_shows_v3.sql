@@ -0,0 +1,67 @@
+-- shows_v3 as built up in netflix.ddl before migrations existed. Every
+-- statement is idempotent so databases that already ran those statements by
+-- hand can be brought under migrate.py.
+create table if not exists netflix.shows_v3
+(
+    show_id       text,
+    type          text,
+    title         text,
+    director      text ARRAY,
+    "cast"        text ARRAY,
+    country       text ARRAY,
+    date_added    date,
+    release_year  integer,
+    rating        text,
+    duration      text,
+    listed_in     text ARRAY,
+    description   text
+);
+
+-- INSERT ... ON CONFLICT (show_id) needs a unique index on show_id
+do $$
+begin
+    if not exists (
+        select 1 from pg_constraint
+        where conrelid = 'netflix.shows_v3'::regclass and contype = 'p'
+    ) then
+        alter table netflix.shows_v3 add primary key (show_id);
+    end if;
+end
+$$;
+
+-- full text search for GET /shows/?q=
+create extension if not exists pg_trgm;
+
+alter table netflix.shows_v3
+    add column if not exists search_vector tsvector generated always as (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) stored;
+
+create index if not exists shows_v3_search_vector_idx on netflix.shows_v3 using gin (search_vector);
+create index if not exists shows_v3_title_trgm_idx on netflix.shows_v3 using gin (title gin_trgm_ops);
+
+-- array containment filters (@> for match=all, && for match=any)
+create index if not exists shows_v3_director_gin_idx on netflix.shows_v3 using gin (director);
+create index if not exists shows_v3_cast_gin_idx on netflix.shows_v3 using gin ("cast");
+create index if not exists shows_v3_country_gin_idx on netflix.shows_v3 using gin (country);
+create index if not exists shows_v3_listed_in_gin_idx on netflix.shows_v3 using gin (listed_in);
+
+-- precomputed aggregates for GET /shows/summary, see summary.py.
+-- the API recomputes them in the same transaction as every write.
+create table if not exists netflix.shows_v3_summary_type_rating as
+    select type, rating, count(*)::integer as count from netflix.shows_v3 group by type, rating;
+create table if not exists netflix.shows_v3_summary_type as
+    select type, count(*)::integer as count from netflix.shows_v3 group by type;
+create table if not exists netflix.shows_v3_summary_rating as
+    select rating, count(*)::integer as count from netflix.shows_v3 group by rating;
+create table if not exists netflix.shows_v3_summary_release_year as
+    select release_year, count(*)::integer as count from netflix.shows_v3 group by release_year;
+create table if not exists netflix.shows_v3_summary_type_release_year as
+    select type, release_year, count(*)::integer as count from netflix.shows_v3 group by type, release_year;
+create table if not exists netflix.shows_v3_summary_country as
+    select c.value as country, count(distinct s.show_id)::integer as count
+    from netflix.shows_v3 s join unnest(s.country) as c(value) on true group by c.value;
+create table if not exists netflix.shows_v3_summary_listed_in as
+    select g.value as listed_in, count(distinct s.show_id)::integer as count
+    from netflix.shows_v3 s join unnest(s.listed_in) as g(value) on true group by g.value;
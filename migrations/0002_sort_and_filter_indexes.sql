@@ -0,0 +1,15 @@
+-- GET /shows/?sort_by=<column>, asc or desc (btree indexes scan both ways).
+-- show_id is the tiebreaker of keyset pagination, so it is part of every key.
+create index if not exists shows_v3_type_sort_idx on netflix.shows_v3 (type, show_id);
+create index if not exists shows_v3_title_sort_idx on netflix.shows_v3 (title, show_id);
+create index if not exists shows_v3_date_added_sort_idx on netflix.shows_v3 (date_added, show_id);
+create index if not exists shows_v3_release_year_sort_idx on netflix.shows_v3 (release_year, show_id);
+create index if not exists shows_v3_rating_sort_idx on netflix.shows_v3 (rating, show_id);
+create index if not exists shows_v3_duration_sort_idx on netflix.shows_v3 (duration, show_id);
+
+-- case insensitive equality filters, lower(<column>) = lower(:value)
+create index if not exists shows_v3_show_id_lower_idx on netflix.shows_v3 (lower(show_id));
+create index if not exists shows_v3_type_lower_idx on netflix.shows_v3 (lower(type), show_id);
+create index if not exists shows_v3_title_lower_idx on netflix.shows_v3 (lower(title));
+create index if not exists shows_v3_rating_lower_idx on netflix.shows_v3 (lower(rating), show_id);
+create index if not exists shows_v3_duration_lower_idx on netflix.shows_v3 (lower(duration));
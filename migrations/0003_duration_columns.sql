@@ -0,0 +1,8 @@
+-- numeric forms of duration, see durations.py. Existing rows are filled in
+-- by `python backfill_durations.py`, which updates them in small batches.
+alter table netflix.shows_v3 add column if not exists duration_minutes integer;
+alter table netflix.shows_v3 add column if not exists seasons integer;
+
+-- duration_minutes_min/max, seasons_min/max and sort_by on either column
+create index if not exists shows_v3_duration_minutes_sort_idx on netflix.shows_v3 (duration_minutes, show_id);
+create index if not exists shows_v3_seasons_sort_idx on netflix.shows_v3 (seasons, show_id);
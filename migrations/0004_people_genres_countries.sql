@@ -0,0 +1,78 @@
+-- normalized people, genres and countries with their show links, see
+-- bridges.py. The arrays on shows_v3 stay as they are; the API keeps them
+-- in sync on every write and filters through these tables.
+create table if not exists netflix.people (
+    person_id serial primary key,
+    name text not null unique
+);
+create table if not exists netflix.show_people (
+    show_id text not null references netflix.shows_v3 (show_id) on delete cascade,
+    person_id integer not null references netflix.people (person_id),
+    role text not null,
+    primary key (show_id, person_id, role)
+);
+create index if not exists show_people_person_id_idx on netflix.show_people (person_id, role, show_id);
+
+create table if not exists netflix.genres (
+    genre_id serial primary key,
+    name text not null unique
+);
+create table if not exists netflix.show_genres (
+    show_id text not null references netflix.shows_v3 (show_id) on delete cascade,
+    genre_id integer not null references netflix.genres (genre_id),
+    primary key (show_id, genre_id)
+);
+create index if not exists show_genres_genre_id_idx on netflix.show_genres (genre_id, show_id);
+
+create table if not exists netflix.countries (
+    country_id serial primary key,
+    name text not null unique
+);
+create table if not exists netflix.show_countries (
+    show_id text not null references netflix.shows_v3 (show_id) on delete cascade,
+    country_id integer not null references netflix.countries (country_id),
+    primary key (show_id, country_id)
+);
+create index if not exists show_countries_country_id_idx on netflix.show_countries (country_id, show_id);
+
+-- backfill from the arrays
+insert into netflix.people (name)
+select distinct e.name
+from netflix.shows_v3 s cross join unnest(coalesce(s.director, '{}') || coalesce(s."cast", '{}')) as e(name)
+where e.name is not null
+on conflict (name) do nothing;
+insert into netflix.show_people (show_id, person_id, role)
+select distinct s.show_id, p.person_id, 'director'
+from netflix.shows_v3 s cross join unnest(s.director) as e(name)
+join netflix.people p on p.name = e.name
+on conflict do nothing;
+insert into netflix.show_people (show_id, person_id, role)
+select distinct s.show_id, p.person_id, 'cast'
+from netflix.shows_v3 s cross join unnest(s."cast") as e(name)
+join netflix.people p on p.name = e.name
+on conflict do nothing;
+
+insert into netflix.genres (name)
+select distinct e.name
+from netflix.shows_v3 s cross join unnest(s.listed_in) as e(name)
+where e.name is not null
+on conflict (name) do nothing;
+insert into netflix.show_genres (show_id, genre_id)
+select distinct s.show_id, g.genre_id
+from netflix.shows_v3 s cross join unnest(s.listed_in) as e(name)
+join netflix.genres g on g.name = e.name
+on conflict do nothing;
+
+insert into netflix.countries (name)
+select distinct e.name
+from netflix.shows_v3 s cross join unnest(s.country) as e(name)
+where e.name is not null
+on conflict (name) do nothing;
+insert into netflix.show_countries (show_id, country_id)
+select distinct s.show_id, c.country_id
+from netflix.shows_v3 s cross join unnest(s.country) as e(name)
+join netflix.countries c on c.name = e.name
+on conflict do nothing;
+
+analyze netflix.people, netflix.show_people, netflix.genres, netflix.show_genres,
+    netflix.countries, netflix.show_countries;
@@ -0,0 +1,149 @@
+"""Database connection pool configuration, warm-up and metrics.
+
+Every new Cloud SQL connection pays for the connector handshake, so the pool
+is sized explicitly and kept warm instead of relying on SQLAlchemy defaults:
+
+    DB_POOL_SIZE        connections kept open (default 5)
+    DB_MAX_OVERFLOW     extra connections opened under load (default 5)
+    DB_POOL_TIMEOUT     seconds to wait for a free connection (default 10)
+    DB_POOL_RECYCLE     seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING    test connections on checkout, 1 or 0 (default 1)
+    DB_POOL_WARMUP      connections opened at startup (default 0)
+"""
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection.
+
+    The wait includes opening a new connection when the pool has none idle,
+    which is where the connector handshake shows up.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        _started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            # only waits for a free connection, not failures to open one
+            with self.stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            _waited = time.perf_counter() - _started
+            with self.stats_lock:
+                self.checkouts += 1
+                self.wait_total += _waited
+                self.wait_max = max(self.wait_max, _waited)
+
+    def recreate(self):
+        # the stats move over to the pool that replaces this one
+        _pool = super().recreate()
+        _pool.checkouts, _pool.timeouts = self.checkouts, self.timeouts
+        _pool.wait_total, _pool.wait_max = self.wait_total, self.wait_max
+        return _pool
+
+
+def pool_options_from_env(database_uri:str) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for the pool, from the DB_POOL_* variables."""
+    if database_uri.startswith("sqlite") and ":memory:" in database_uri:
+        # one shared connection, Flask-SQLAlchemy sets up a StaticPool
+        return {}
+    _options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        # Cloud SQL and the proxies in front of it drop long idle connections,
+        # replace them before that happens rather than failing a request
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") != "0",
+    }
+    if database_uri.startswith("sqlite"):
+        # pooled sqlite connections are handed between request threads
+        _options["connect_args"] = {"check_same_thread": False}
+    return _options
+
+
+def warm_up(engine, connections:int=None) -> int:
+    """Open `connections` (DB_POOL_WARMUP) connections so they sit idle in the pool.
+
+    Returns the number opened; failures are logged, the pool still opens
+    connections on demand.
+    """
+    if connections is None:
+        connections = int(os.environ.get("DB_POOL_WARMUP", 0))
+    _opened = []
+    try:
+        for _ in range(connections):
+            _opened.append(engine.connect())
+    except Exception:
+        logger.exception("pool warm-up stopped after %d connections", len(_opened))
+    finally:
+        for _connection in _opened:
+            _connection.close()
+    return len(_opened)
+
+
+class PoolMetrics:
+    """Counts connection opens and invalidations of an engine's pool."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connects = 0
+        self.invalidations = 0
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        _pool = self.engine.pool
+        _stats = {
+            "pool": type(_pool).__name__,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(_pool, QueuePool):
+            _stats.update(
+                {
+                    "size": _pool.size(),
+                    "checked_in": _pool.checkedin(),
+                    "checked_out": _pool.checkedout(),
+                    # negative while the pool hasn't opened pool_size connections yet
+                    "overflow": _pool.overflow(),
+                    "max_overflow": _pool._max_overflow,
+                    "timeout": _pool.timeout(),
+                }
+            )
+        if isinstance(_pool, TimedQueuePool):
+            with _pool.stats_lock:
+                _stats.update(
+                    {
+                        "checkouts": _pool.checkouts,
+                        "checkout_timeouts": _pool.timeouts,
+                        "wait_seconds_total": round(_pool.wait_total, 6),
+                        "wait_seconds_max": round(_pool.wait_max, 6),
+                    }
+                )
+        return _stats
@@ -0,0 +1,178 @@
+"""In-process cache of rendered GET responses, with ETags.
+
+Entries are keyed on the path, the normalized query string and the response
+format negotiated from the Accept header (see serialization.py) and are only
+valid for the catalog version they were rendered at. Every write bumps the
+version, which drops the whole cache. Entries also expire after `ttl`
+seconds, which bounds staleness when another instance did the write.
+"""
+import collections
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import request
+from flask_restx.utils import unpack
+from werkzeug.wrappers import Response
+
+from serialization import response_format
+
+
+def normalize_args(args, defaults:dict=None, case_insensitive=()) -> tuple:
+    """Hashable, order independent form of a query string.
+
+    `defaults` are filled in for missing keys and the values of
+    `case_insensitive` keys are lowercased, so equivalent requests share one
+    entry. Keys are kept as sent, the handlers read them case sensitively.
+    """
+    _normalized = {}
+    for _key in args:
+        _values = args.getlist(_key)
+        if _key in case_insensitive:
+            _values = [v.lower() for v in _values]
+        _normalized.setdefault(_key, []).extend(_values)
+    for _key, _value in (defaults or {}).items():
+        _normalized.setdefault(_key, [str(_value)])
+    return tuple(sorted((k, tuple(sorted(v))) for k, v in _normalized.items()))
+
+
+def cache_key(path:str, args, response_format:str, defaults:dict=None, case_insensitive=()):
+    """The entry of a GET, shared by the Flask handlers and asgi.py."""
+    return (path, normalize_args(args, defaults, case_insensitive), response_format)
+
+
+def etag_of(body:bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    """LRU cache bounded by both entry count and total body size."""
+
+    def __init__(
+        self,
+        api,
+        max_entries:int=1024,
+        max_bytes:int=32 * 1024 * 1024,
+        ttl:float=300,
+        max_age:int=30,
+    ):
+        self.api = api
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_age = max_age
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        # key -> (version, expires_at, etag, status, headers, body)
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, api):
+        return cls(
+            api,
+            max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", 1024)),
+            max_bytes=int(os.environ.get("CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+            ttl=float(os.environ.get("CACHE_TTL", 300)),
+            max_age=int(os.environ.get("CACHE_MAX_AGE", 30)),
+        )
+
+    def bump(self):
+        """Invalidate everything, call after every write to the catalog."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            _entry = self._entries.get(key)
+            if _entry is not None and (
+                _entry[0] != self.version or _entry[1] < time.monotonic()
+            ):
+                self._evict(key)
+                _entry = None
+            if _entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _entry
+
+    def put(self, key, version:int, etag:str, status:int, headers:dict, body:bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                # a write happened while this response was being rendered
+                return
+            if key in self._entries:
+                self._evict(key)
+            _expires_at = time.monotonic() + self.ttl
+            self._entries[key] = (version, _expires_at, etag, status, headers, body)
+            self._bytes += len(body)
+            # least recently used entries are at the front
+            while (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        _entry = self._entries.pop(key)
+        self._bytes -= len(_entry[5])
+
+    def _conditional(self, response:Response, etag:str) -> Response:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        # weak comparison, compression turns the ETag weak, see compression.py
+        if request.if_none_match.contains_weak(etag):
+            _not_modified = Response(status=304)
+            _not_modified.set_etag(etag)
+            _not_modified.headers["Cache-Control"] = response.headers["Cache-Control"]
+            return _not_modified
+        return response
+
+    def cached(self, defaults:dict=None, case_insensitive=()):
+        """Decorate a Resource GET method to serve and fill the cache."""
+
+        def _decorator(view):
+            @wraps(view)
+            def _wrapper(*args, **kwargs):
+                _key = cache_key(
+                    request.path,
+                    request.args,
+                    response_format(),
+                    defaults,
+                    case_insensitive,
+                )
+                _entry = self.get(_key)
+                if _entry is not None:
+                    _, _, _etag, _status, _headers, _body = _entry
+                    _response = Response(_body, status=_status, headers=_headers)
+                    _response.headers["X-Cache"] = "HIT"
+                    return self._conditional(_response, _etag)
+
+                _version = self.version
+                _result = view(*args, **kwargs)
+                if isinstance(_result, Response):
+                    _response = _result
+                else:
+                    _data, _code, _headers = unpack(_result)
+                    _response = self.api.make_response(_data, _code, headers=_headers)
+                if _response.status_code != 200 or _response.is_streamed:
+                    return _response
+
+                _body = _response.get_data()
+                _etag = etag_of(_body)
+                _headers = dict(_response.headers)
+                self.put(_key, _version, _etag, _response.status_code, _headers, _body)
+                _response.headers["X-Cache"] = "MISS"
+                return self._conditional(_response, _etag)
+
+            return _wrapper
+
+        return _decorator
@@ -0,0 +1,114 @@
+"""Full text search over show titles and descriptions.
+
+On postgres the `q` parameter is matched against the generated, GIN indexed
+`search_vector` column (see netflix.ddl) and fuzzily against `title` through
+pg_trgm. The local sqlite stand-in keeps an FTS5 table in sync with triggers.
+"""
+import re
+
+import sqlalchemy
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+SQLITE_FTS_TABLE = "shows_fts"
+_WORD_RE = re.compile(r"\w")
+
+_SQLITE_FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE}
+    USING fts5(show_id UNINDEXED, title, description, tokenize = 'porter unicode61')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai AFTER INSERT ON {{table}} BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE} (show_id, title, description)
+        VALUES (new.show_id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad AFTER DELETE ON {{table}} BEGIN
+        DELETE FROM {SQLITE_FTS_TABLE} WHERE show_id = old.show_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au AFTER UPDATE ON {{table}} BEGIN
+        DELETE FROM {SQLITE_FTS_TABLE} WHERE show_id = old.show_id;
+        INSERT INTO {SQLITE_FTS_TABLE} (show_id, title, description)
+        VALUES (new.show_id, new.title, new.description);
+    END""",
+    # pick up rows that existed before the triggers did
+    f"""INSERT INTO {SQLITE_FTS_TABLE} (show_id, title, description)
+    SELECT show_id, title, description FROM {{table}}
+    WHERE show_id NOT IN (SELECT show_id FROM {SQLITE_FTS_TABLE})""",
+)
+
+
+class trigram_similar(FunctionElement):
+    """`left % right`, pg_trgm's similarity operator."""
+
+    type = sqlalchemy.Boolean()
+    name = "trigram_similar"
+    inherit_cache = True
+
+
+@compiles(trigram_similar)
+def _compile_trigram_similar(element, compiler, **kw):
+    _left, _right = element.clauses
+    # a bare `%` starts a placeholder for the format paramstyle drivers, as
+    # in SQLAlchemy's modulo operator for pg8000 (whose preparer doesn't say so)
+    _doubled = compiler.dialect.paramstyle in ("format", "pyformat")
+    _operator = " %% " if _doubled else " % "
+    return compiler.process(_left, **kw) + _operator + compiler.process(_right, **kw)
+
+
+def create_sqlite_index(engine, table_name:str):
+    """Create (idempotently) the FTS5 table and its sync triggers."""
+    with engine.begin() as _connection:
+        for _statement in _SQLITE_FTS_DDL:
+            _connection.exec_driver_sql(_statement.format(table=table_name))
+
+
+def has_terms(q:str) -> bool:
+    """Whether `q` has a word to search for, not just spaces or punctuation.
+
+    A `q` without one is treated as absent, FTS5 rejects an empty MATCH.
+    """
+    return bool(q) and _WORD_RE.search(q) is not None
+
+
+def _fts5_query(q:str) -> str:
+    # quote every term so user input can't be parsed as FTS5 syntax,
+    # adjacent strings are ANDed together
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in q.split())
+
+
+def apply_search(query, model, q:str, dialect_name:str):
+    """Filter `query` to shows matching `q`.
+
+    Returns the filtered query and a rank expression where larger is a
+    better match, for ordering the results.
+    """
+    if dialect_name == "postgresql":
+        _vector = sqlalchemy.literal_column(
+            f"{model.__tablename__}.search_vector", type_=postgresql.TSVECTOR
+        )
+        _tsquery = func.websearch_to_tsquery("english", q)
+        _query = query.filter(
+            sqlalchemy.or_(
+                _vector.op("@@")(_tsquery),
+                # served by the trigram index
+                trigram_similar(model.title, q),
+            )
+        )
+        _rank = func.ts_rank(_vector, _tsquery) + func.similarity(model.title, q)
+        return _query, _rank
+
+    if dialect_name == "sqlite":
+        _fts = sqlalchemy.table(SQLITE_FTS_TABLE, sqlalchemy.column("show_id"))
+        _fts_table = sqlalchemy.literal_column(SQLITE_FTS_TABLE)
+        _query = query.join(_fts, _fts.c.show_id == model.show_id).filter(
+            _fts_table.op("MATCH")(_fts5_query(q))
+        )
+        # bm25() is negative, more negative is more relevant
+        return _query, -func.bm25(_fts_table)
+
+    # no index available, fall back to substring matching
+    _pattern = f"%{q}%"
+    _query = query.filter(
+        sqlalchemy.or_(model.title.ilike(_pattern), model.description.ilike(_pattern))
+    )
+    return _query, sqlalchemy.literal(0)
@@ -0,0 +1,102 @@
+"""Response encoding for the read paths.
+
+Rows are encoded exactly once, with orjson when it is installed. The format
+is negotiated with the Accept header:
+
+    application/json                      the default
+    application/vnd.shows.columnar+json   rows as one array per field
+    application/msgpack                   when `msgpack` is installed
+
+The columnar form turns a list of rows, or the `results` of an object, into
+{"field": [value, ...], ...}, so field names are sent once per response
+instead of once per row.
+"""
+import datetime
+import json
+
+from flask import Response, has_request_context, request
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from metrics import add_rows, timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.shows.columnar+json"
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    with timed("serialize"):
+        if orjson is not None:
+            # orjson encodes dates as ISO 8601 itself
+            return orjson.dumps(obj, default=_default)
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode("UTF-8")
+
+
+def columnar(obj):
+    """[{"a": 1, "b": 2}, {"a": 3}] -> {"a": [1, 3], "b": [2, None]}
+
+    Applies to a list of rows or to the `results` rows of an object, other
+    values are returned as is.
+    """
+    if isinstance(obj, dict) and isinstance(obj.get("results"), list):
+        return {**obj, "results": columnar(obj["results"])}
+    if not isinstance(obj, list) or not all(isinstance(r, dict) for r in obj):
+        return obj
+    _fields = list(dict.fromkeys(f for row in obj for f in row))
+    return {f: [row.get(f) for row in obj] for f in _fields}
+
+
+def _dumps_columnar(obj) -> bytes:
+    return dumps(columnar(obj))
+
+
+def _dumps_msgpack(obj) -> bytes:
+    with timed("serialize"):
+        return msgpack.packb(obj, default=_default)
+
+
+# mimetype -> encoder, the first is the default
+FORMATS = {JSON: dumps, COLUMNAR_JSON: _dumps_columnar}
+if msgpack is not None:
+    FORMATS["application/msgpack"] = _dumps_msgpack
+    FORMATS["application/x-msgpack"] = _dumps_msgpack
+
+
+def response_format() -> str:
+    """The mimetype of `FORMATS` the request's Accept header prefers."""
+    if not has_request_context():
+        return JSON
+    return request.accept_mimetypes.best_match(list(FORMATS), default=JSON)
+
+
+def format_for(accept:str) -> str:
+    """`response_format` of an Accept header, for requests outside Flask."""
+    return parse_accept_header(accept, MIMEAccept).best_match(list(FORMATS), default=JSON)
+
+
+def json_response(obj, status:int=200, headers:dict=None) -> Response:
+    """`obj` encoded in the negotiated format, JSON unless Accept asks otherwise."""
+    if isinstance(obj, list):
+        add_rows(len(obj))
+    _format = response_format()
+    _response = Response(
+        FORMATS[_format](obj), status=status, headers=headers, mimetype=_format
+    )
+    _response.vary.add("Accept")
+    return _response
@@ -0,0 +1,167 @@
+"""Opt-in log of slow SQL statements, grouped by query shape.
+
+    SLOW_QUERY_MS               log statements slower than this (unset: off)
+    SLOW_QUERY_EXPLAIN_INTERVAL seconds between plan samples per shape (default 300)
+
+A shape is the statement with its literals and parameter lists collapsed, so
+every combination of list filters maps onto a few shapes. Every slow statement
+is logged with its parameters redacted to their types, and counted against
+its shape. Slow SELECTs are re-run under EXPLAIN (ANALYZE, BUFFERS) on
+postgres, EXPLAIN QUERY PLAN on sqlite, at most once per shape per interval
+and on a background thread, so the plan of each shape shows which index is
+missing.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:%s|\?|:\w+|%\(\w+\)s|\$\d+)"
+_PLACEHOLDER_LISTS = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_shape(statement:str) -> str:
+    """The statement with literals and placeholder lists collapsed to `?`."""
+    _shape = _PLACEHOLDER_LISTS.sub("(?)", statement)
+    _shape = _LITERALS.sub("?", _shape)
+    return _WHITESPACE.sub(" ", _shape).strip()
+
+
+def redact(parameters):
+    """Parameter values replaced by their type (and length), never logged as is."""
+    if isinstance(parameters, dict):
+        return {k: redact(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(v) for v in parameters]
+    if parameters is None:
+        return None
+    if isinstance(parameters, (str, bytes)):
+        return f"<{type(parameters).__name__}:{len(parameters)}>"
+    return f"<{type(parameters).__name__}>"
+
+
+class SlowQueryLog:
+    def __init__(self, engine, threshold:float, explain_interval:float=300):
+        self.engine = engine
+        self.threshold = threshold
+        self.explain_interval = explain_interval
+        # shape id -> aggregate, see `_record`
+        self.shapes = {}
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        _elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+        if _elapsed < self.threshold or conn.info.get("slow_query_explaining"):
+            return
+        _shape = query_shape(statement)
+        _shape_id = hashlib.sha1(_shape.encode("UTF-8")).hexdigest()[:12]
+        logger.warning(
+            "slow query %.1fms shape=%s params=%s: %s",
+            _elapsed * 1000,
+            _shape_id,
+            redact(parameters),
+            _shape,
+        )
+        if self._record(_shape_id, _shape, _elapsed, parameters) and not executemany:
+            threading.Thread(
+                target=self._explain,
+                args=(_shape_id, statement, parameters),
+                daemon=True,
+            ).start()
+
+    def _error(self, exception_context):
+        _connection = exception_context.connection
+        if _connection is not None and _connection.info.get("slow_query_started"):
+            _connection.info["slow_query_started"].pop()
+
+    def _record(self, shape_id:str, shape:str, elapsed:float, parameters) -> bool:
+        """Count a slow run of the shape, returning whether to sample its plan."""
+        _now = time.monotonic()
+        with self._lock:
+            _aggregate = self.shapes.setdefault(
+                shape_id,
+                {
+                    "shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "last_params": None,
+                    "plan": None,
+                    "explained_at": None,
+                },
+            )
+            _aggregate["count"] += 1
+            _aggregate["total_ms"] += elapsed * 1000
+            _aggregate["max_ms"] = max(_aggregate["max_ms"], elapsed * 1000)
+            _aggregate["last_params"] = redact(parameters)
+            if not shape.lower().startswith(("select", "with")):
+                # EXPLAIN ANALYZE runs the statement, only repeat reads
+                return False
+            _explained_at = _aggregate["explained_at"]
+            if _explained_at is not None and _now - _explained_at < self.explain_interval:
+                return False
+            _aggregate["explained_at"] = _now
+            return True
+
+    def _explain(self, shape_id:str, statement:str, parameters):
+        try:
+            with self.engine.connect() as _connection:
+                _connection.info["slow_query_explaining"] = True
+                try:
+                    if _connection.dialect.name == "postgresql":
+                        _rows = _connection.exec_driver_sql(
+                            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}",
+                            parameters,
+                        ).all()
+                        _plan = _rows[0][0]
+                        if isinstance(_plan, str):
+                            _plan = json.loads(_plan)
+                    else:
+                        _rows = _connection.exec_driver_sql(
+                            f"EXPLAIN QUERY PLAN {statement}", parameters
+                        ).all()
+                        _plan = [row[-1] for row in _rows]
+                finally:
+                    _connection.info.pop("slow_query_explaining", None)
+        except Exception:
+            logger.exception("could not explain slow query shape=%s", shape_id)
+            return
+        with self._lock:
+            self.shapes[shape_id]["plan"] = _plan
+        logger.warning("plan of slow query shape=%s: %s", shape_id, json.dumps(_plan))
+
+    def report(self) -> list:
+        """Every shape seen, the most total time first."""
+        with self._lock:
+            _shapes = [
+                {"shape_id": k, **{f: v for f, v in a.items() if f != "explained_at"}}
+                for k, a in self.shapes.items()
+            ]
+        return sorted(_shapes, key=lambda a: a["total_ms"], reverse=True)
+
+
+def slow_query_log_from_env(engine):
+    """A SlowQueryLog when SLOW_QUERY_MS is set, else None."""
+    _threshold_ms = os.environ.get("SLOW_QUERY_MS")
+    if not _threshold_ms:
+        return None
+    return SlowQueryLog(
+        engine,
+        threshold=float(_threshold_ms) / 1000,
+        explain_interval=float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 300)),
+    )
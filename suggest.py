@@ -0,0 +1,185 @@
+"""Prefix autocomplete over show titles and director and cast names.
+
+Names are normalized (case folded, accents and punctuation dropped) and kept
+in two sorted arrays: one of the whole names, and one of every name from its
+second word on, so "esc" finds "The Great Escape". A lookup is a bisect to
+the first key with the prefix and a walk over the next `limit` keys.
+Matches on the whole name come first, then the others, alphabetically.
+
+The index is built on first use, not when main.py is imported (migrate.py
+imports it before the shows table exists), and updated by the API's own
+writes. Writes from other processes, like loader.py, only show up after a
+restart.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+
+import sqlalchemy
+
+_WORD_RE = re.compile(r"\w+")
+PEOPLE_COLUMNS = ("director", "cast")
+
+
+def normalize(text:str) -> str:
+    """'  Amélie, the-Movie ' -> 'amelie the movie'"""
+    _decomposed = unicodedata.normalize("NFKD", text)
+    _stripped = "".join(c for c in _decomposed if not unicodedata.combining(c))
+    return " ".join(_WORD_RE.findall(_stripped.casefold()))
+
+
+def _keys(value:str) -> tuple:
+    """(the whole normalized name, [the name from each later word on])"""
+    _words = normalize(value).split(" ")
+    return " ".join(_words), [" ".join(_words[i:]) for i in range(1, len(_words))]
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # () -> rows to index on first use, see `from_database`
+        self._source = None
+        self._source_lock = threading.Lock()
+        # sorted (key, kind, value, show_id), show_id is "" for people
+        self._starts = []
+        self._inner = []
+        # show_id -> (title, people names) it was indexed with
+        self._shows = {}
+        # person name -> show_ids, the entry goes when the last show does
+        self._people = {}
+
+    @classmethod
+    def from_database(cls, engine, table):
+        """An index of `table`, read on the first lookup or update."""
+        _index = cls()
+        _index._source = lambda: _index.load_database(engine, table)
+        return _index
+
+    def _ensure_loaded(self):
+        if self._source is None:
+            return
+        with self._source_lock:
+            if self._source is not None:
+                self._source()
+                self._source = None
+
+    def load_database(self, engine, table):
+        """Index every show of `table` from scratch."""
+        _columns = [table.c.show_id, table.c.title] + [table.c[c] for c in PEOPLE_COLUMNS]
+        with engine.connect() as _connection:
+            self.load(
+                dict(row._mapping)
+                for row in _connection.execute(sqlalchemy.select(*_columns))
+            )
+
+    # the index is updated after a write has committed, so values that aren't
+    # text are skipped rather than failing the request
+
+    @staticmethod
+    def _title_of(row:dict):
+        _title = row.get("title")
+        return _title if isinstance(_title, str) and _title else None
+
+    @staticmethod
+    def _people_of(row:dict) -> set:
+        return {
+            n
+            for c in PEOPLE_COLUMNS
+            if isinstance(row.get(c), (list, tuple))
+            for n in row[c]
+            if isinstance(n, str) and n
+        }
+
+    @staticmethod
+    def _entries(kind:str, value:str, show_id:str) -> tuple:
+        _start, _tails = _keys(value)
+        return (
+            [(_start, kind, value, show_id)] if _start else [],
+            [(k, kind, value, show_id) for k in _tails],
+        )
+
+    def load(self, rows):
+        """Index `rows` (show_id, title, director, cast) from scratch."""
+        _starts, _inner, _shows, _people = [], [], {}, {}
+        for _row in rows:
+            _names = self._people_of(_row)
+            _shows[_row["show_id"]] = (self._title_of(_row), _names)
+            for _name in _names:
+                _people.setdefault(_name, set()).add(_row["show_id"])
+            if self._title_of(_row):
+                _start, _tails = self._entries("title", _row["title"], _row["show_id"])
+                _starts += _start
+                _inner += _tails
+        for _name in _people:
+            _start, _tails = self._entries("person", _name, "")
+            _starts += _start
+            _inner += _tails
+        _starts.sort()
+        _inner.sort()
+        with self._lock:
+            self._starts, self._inner = _starts, _inner
+            self._shows, self._people = _shows, _people
+
+    def _insert(self, entries:tuple):
+        for _array, _entries in zip((self._starts, self._inner), entries):
+            for _entry in _entries:
+                bisect.insort(_array, _entry)
+
+    def _remove(self, entries:tuple):
+        for _array, _entries in zip((self._starts, self._inner), entries):
+            for _entry in _entries:
+                _position = bisect.bisect_left(_array, _entry)
+                if _position < len(_array) and _array[_position] == _entry:
+                    del _array[_position]
+
+    def update(self, rows):
+        """Re-index the shows in `rows` (show_id, title, director, cast) after a write."""
+        self._ensure_loaded()
+        with self._lock:
+            for _row in rows:
+                _show_id = _row["show_id"]
+                _old_title, _old_names = self._shows.pop(_show_id, (None, set()))
+                _names = self._people_of(_row)
+                if _old_title:
+                    self._remove(self._entries("title", _old_title, _show_id))
+                if self._title_of(_row):
+                    self._insert(self._entries("title", _row["title"], _show_id))
+                for _name in _old_names - _names:
+                    self._people[_name].discard(_show_id)
+                    if not self._people[_name]:
+                        del self._people[_name]
+                        self._remove(self._entries("person", _name, ""))
+                for _name in _names - _old_names:
+                    if _name not in self._people:
+                        self._people[_name] = set()
+                        self._insert(self._entries("person", _name, ""))
+                    self._people[_name].add(_show_id)
+                self._shows[_show_id] = (self._title_of(_row), _names)
+
+    def suggest(self, prefix:str, limit:int=10) -> list:
+        """Up to `limit` titles and people starting with `prefix`."""
+        _prefix = normalize(prefix)
+        if not _prefix or limit < 1:
+            return []
+        self._ensure_loaded()
+        _found = {}
+        with self._lock:
+            for _array in (self._starts, self._inner):
+                _position = bisect.bisect_left(_array, (_prefix,))
+                while len(_found) < limit and _position < len(_array):
+                    _key, _kind, _value, _show_id = _array[_position]
+                    if not _key.startswith(_prefix):
+                        break
+                    if (_kind, _value, _show_id) not in _found:
+                        if _kind == "title":
+                            _match = {"kind": _kind, "value": _value, "show_id": _show_id}
+                        else:
+                            _match = {
+                                "kind": _kind,
+                                "value": _value,
+                                "shows": len(self._people[_value]),
+                            }
+                        _found[(_kind, _value, _show_id)] = _match
+                    _position += 1
+        return list(_found.values())
@@ -0,0 +1,208 @@
+"""Aggregates for GET /shows/summary.
+
+Grouping by an array column (director, cast, country, listed_in) groups by
+its individual elements, unnested server side.
+
+The catalog only changes on writes, so the common group by combinations are
+kept in small summary tables, maintained in the same transaction as every
+write: the counts of the shows being written are read before and after the
+change and only the difference is applied, so a write costs the same however
+big the catalog is. Loads rebuild the tables from scratch. On postgres, an
+advisory lock held until commit keeps concurrent writers from interleaving
+their read-modify-write of the counts. Requests for any other grouping, or
+with a filter, fall back to a live GROUP BY.
+"""
+import collections
+from contextlib import contextmanager
+
+import sqlalchemy
+from sqlalchemy import func
+
+from db_types import TextArray, unnest
+
+# pg_advisory_xact_lock key of the summary tables
+SUMMARY_LOCK_KEY = 7_402_113
+
+# the group by combinations worth precomputing
+SUMMARY_GROUPINGS = (
+    ("type", "rating"),
+    ("type",),
+    ("rating",),
+    ("release_year",),
+    ("type", "release_year"),
+    ("country",),
+    ("listed_in",),
+)
+
+
+def is_array_column(model, name:str) -> bool:
+    return isinstance(model.__table__.c[name].type, TextArray)
+
+
+def summary_select(model, group_by:list, dialect_name:str):
+    """SELECT <group_by...>, count GROUP BY <group_by...>, unnesting arrays."""
+    _table = model.__table__
+    _from = _table
+    _columns = []
+    _count = func.count()
+    for _name in group_by:
+        if is_array_column(model, _name):
+            _elements = unnest(_table.c[_name], dialect_name)
+            _from = _from.join(_elements, sqlalchemy.true())
+            _columns.append(_elements.c.value.label(_name))
+            # a show repeating an element in its array still only counts once
+            _count = func.count(_table.c.show_id.distinct())
+        else:
+            _columns.append(_table.c[_name])
+    return (
+        sqlalchemy.select(*_columns, _count.label("count"))
+        .select_from(_from)
+        .group_by(*_columns)
+    )
+
+
+def define_summary_tables(metadata, model) -> dict:
+    """Declare one summary table per grouping, keyed by the set of columns."""
+    _tables = {}
+    for _grouping in SUMMARY_GROUPINGS:
+        _columns = [
+            sqlalchemy.Column(
+                _column,
+                sqlalchemy.Text()
+                if is_array_column(model, _column)
+                else model.__table__.c[_column].type,
+            )
+            for _column in _grouping
+        ]
+        _tables[frozenset(_grouping)] = sqlalchemy.Table(
+            f"{model.__tablename__}_summary_{'_'.join(_grouping)}",
+            metadata,
+            *_columns,
+            sqlalchemy.Column("count", sqlalchemy.Integer, nullable=False),
+        )
+    return _tables
+
+
+def _group_columns(table) -> list:
+    return [c.name for c in table.columns if c.name != "count"]
+
+
+def lock_summaries(session):
+    """Serialize summary maintenance with other writers until commit.
+
+    sqlite already allows a single writer at a time.
+    """
+    if session.connection().dialect.name == "postgresql":
+        session.execute(sqlalchemy.select(func.pg_advisory_xact_lock(SUMMARY_LOCK_KEY)))
+
+
+def refresh_summaries(session, model, tables:dict):
+    """Recompute every summary table from `model`'s table, after a load.
+
+    Call before committing so readers never see the summaries out of step
+    with the catalog. Writes of a few shows use `summaries_updated`.
+    """
+    # core statements don't autoflush, make pending ORM changes visible first
+    session.flush()
+    lock_summaries(session)
+    _dialect_name = session.connection().dialect.name
+    for _table in tables.values():
+        _group_by = [c.name for c in _table.columns if c.name != "count"]
+        session.execute(_table.delete())
+        session.execute(
+            _table.insert().from_select(
+                [c.name for c in _table.columns],
+                summary_select(model, _group_by, _dialect_name),
+            )
+        )
+
+
+def summary_counts(session, model, tables:dict, show_ids:list) -> dict:
+    """{grouping: Counter({group values: count})} of just the `show_ids`."""
+    session.flush()
+    _dialect_name = session.connection().dialect.name
+    _counts = {}
+    for _grouping, _table in tables.items():
+        _select = summary_select(model, _group_columns(_table), _dialect_name).where(
+            model.__table__.c.show_id.in_(show_ids)
+        )
+        _counts[_grouping] = collections.Counter(
+            {tuple(row[:-1]): row[-1] for row in session.execute(_select)}
+        )
+    return _counts
+
+
+def apply_summary_changes(session, tables:dict, before:dict, after:dict):
+    """Move the summary tables from the `before` to the `after` counts."""
+    for _grouping, _table in tables.items():
+        _delta = collections.Counter(after[_grouping])
+        _delta.subtract(before[_grouping])
+        _delta = {k: v for k, v in _delta.items() if v}
+        if not _delta:
+            continue
+        _columns = _group_columns(_table)
+        # the summary tables hold one row per group, a few hundred at most
+        _current = {
+            tuple(row[:-1]): row[-1]
+            for row in session.execute(
+                sqlalchemy.select(*[_table.c[c] for c in _columns], _table.c["count"])
+            )
+        }
+        _updates, _inserts, _deletes = [], [], []
+        for _group, _change in _delta.items():
+            _key = {f"key_{c}": v for c, v in zip(_columns, _group)}
+            _count = _current.get(_group, 0) + _change
+            if _group not in _current:
+                if _count > 0:
+                    _inserts.append({**dict(zip(_columns, _group)), "count": _count})
+            elif _count > 0:
+                _updates.append({**_key, "new_count": _count})
+            else:
+                _deletes.append(_key)
+        # IS NOT DISTINCT FROM, so the NULL group of a nullable column matches
+        _match = sqlalchemy.and_(
+            *[
+                _table.c[c].is_not_distinct_from(sqlalchemy.bindparam(f"key_{c}"))
+                for c in _columns
+            ]
+        )
+        if _updates:
+            session.execute(
+                _table.update()
+                .where(_match)
+                .values(count=sqlalchemy.bindparam("new_count")),
+                _updates,
+            )
+        if _inserts:
+            session.execute(_table.insert(), _inserts)
+        if _deletes:
+            session.execute(_table.delete().where(_match), _deletes)
+
+
+@contextmanager
+def summaries_updated(session, model, tables:dict, show_ids:list):
+    """Keep the summary tables in step with writes to `show_ids` in the block.
+
+        with summaries_updated(db.session, Show, SUMMARY_TABLES, ["s1"]):
+            show.rating = "PG"
+    """
+    lock_summaries(session)
+    _before = summary_counts(session, model, tables, show_ids)
+    yield
+    apply_summary_changes(
+        session, tables, _before, summary_counts(session, model, tables, show_ids)
+    )
+
+
+def precomputed_summary(session, tables:dict, group_by:list, top:int=None):
+    """Rows for `group_by` from its summary table, or None if not precomputed."""
+    _table = tables.get(frozenset(group_by))
+    if _table is None:
+        return None
+    if top is not None and top < 1:
+        raise ValueError("top must be at least 1")
+    _select = sqlalchemy.select(_table)
+    if top:
+        _select = _select.order_by(_table.c["count"].desc()).limit(top)
+    # the keys are the columns' quoted_name, which orjson doesn't take as str
+    return [{str(k): v for k, v in row._mapping.items()} for row in session.execute(_select)]
@@ -0,0 +1,95 @@
+"""The API against a throwaway database, seeded through POST /shows/bulk.
+
+A temporary sqlite file, or the database TEST_DATABASE_URL points at. Every
+test empties its tables.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# main configures its database on import
+_database = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+_database.close()
+os.environ["DATABASE_URL"] = (
+    os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{_database.name}"
+)
+os.environ.setdefault("CREDENTIALS_BACKEND", "env")
+
+import main  # noqa: E402
+from catalog import Catalog, CatalogStore  # noqa: E402
+
+SHOWS = [
+    {
+        "show_id": "s1",
+        "type": "Movie",
+        "title": "The Great Escape",
+        "director": ["Ann Lee"],
+        "cast": ["Ryan Reynolds", "Bo Chen"],
+        "country": ["United States"],
+        "date_added": "2020-01-02",
+        "release_year": 1999,
+        "rating": "PG-13",
+        "duration": "90 min",
+        "listed_in": ["Dramas", "Comedies"],
+        "description": "A daring escape from prison",
+    },
+    {
+        "show_id": "s2",
+        "type": "TV Show",
+        "title": "Escape Room",
+        "director": None,
+        "cast": ["Ryan Reynolds"],
+        "country": ["India", "United States"],
+        "date_added": "2021-03-04",
+        "release_year": 2019,
+        "rating": "TV-MA",
+        "duration": "2 Seasons",
+        "listed_in": ["Thrillers"],
+        "description": "Puzzles and traps",
+    },
+    {
+        "show_id": "s3",
+        "type": "Movie",
+        "title": "Cooking Show",
+        "director": ["Cy Diaz"],
+        "cast": ["Zoe Park"],
+        "country": ["France"],
+        "date_added": "2020-06-01",
+        "release_year": 2005,
+        "rating": "PG",
+        "duration": "100 min",
+        "listed_in": ["Documentaries"],
+        "description": "Food food food",
+    },
+]
+
+
+@pytest.fixture
+def client():
+    with main.app.app_context():
+        for _table in reversed(main.db.metadata.sorted_tables):
+            main.db.session.execute(_table.delete())
+        main.db.session.commit()
+        _client = main.app.test_client()
+        _response = _client.post("/shows/bulk", json=SHOWS)
+        assert _response.status_code == 200, _response.data
+        yield _client
+
+
+@pytest.fixture
+def memory_catalog(monkeypatch):
+    """Call to switch the app to CATALOG_BACKEND=memory."""
+
+    def _enable():
+        monkeypatch.setattr(
+            main,
+            "catalog",
+            CatalogStore(lambda: Catalog.from_database(main.db.engine, main.Show.__table__)),
+        )
+        # the cached database responses would answer for the memory backend
+        main.response_cache.bump()
+
+    return _enable
@@ -0,0 +1,123 @@
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import main
+
+# answered by the async handlers
+ASYNC_URLS = (
+    "/shows/",
+    "/shows/?per_page=2&page=2",
+    "/shows/?sort_by=title&sort_direction=desc&fields=title",
+    "/shows/?cast=Ryan Reynolds&release_year_min=2000",
+    "/shows/?q=escape",
+    "/shows/?per_page=2&cursor=",
+    "/shows/?page=9",
+    "/shows/?cursor=bad",
+    "/shows/?sort_by=cast",
+    "/shows/?fields=nope",
+    "/shows/s2",
+    "/shows/s2?fields=title,cast",
+    "/shows/missing",
+)
+
+
+@pytest.fixture
+def async_client(client):
+    with TestClient(asgi.create_app()) as _client:
+        yield _client
+
+
+@pytest.mark.parametrize("url", ASYNC_URLS)
+def test_same_responses_as_flask(client, async_client, url):
+    _expected = client.get(url)
+    main.response_cache.bump()
+    _response = async_client.get(url)
+    assert _response.status_code == _expected.status_code
+    if _expected.status_code == 404:
+        # flask-restx appends a "did you mean" hint to its 404 messages
+        assert _expected.get_json()["message"].startswith(_response.json()["message"])
+    else:
+        assert _response.json() == _expected.get_json()
+    assert _response.headers.get("X-Next-Cursor") == _expected.headers.get(
+        "X-Next-Cursor"
+    )
+    if _expected.status_code == 200:
+        assert _response.headers["ETag"] == _expected.headers["ETag"]
+
+
+def test_batch_get(client, async_client):
+    _body = {"show_ids": ["s3", "nope", "s1", "s3"], "fields": ["title"]}
+    _response = async_client.post("/shows/batch-get", json=_body)
+    assert _response.status_code == 200
+    assert _response.json() == client.post("/shows/batch-get", json=_body).get_json()
+    assert async_client.post("/shows/batch-get", json=[]).status_code == 400
+
+
+def test_shares_the_response_cache(client, async_client):
+    main.response_cache.bump()
+    _filled = client.get("/shows/?type=movie")
+    _hit = async_client.get("/shows/?type=Movie")
+    assert _hit.headers["X-Cache"] == "HIT"
+    assert _hit.content == _filled.data
+    _not_modified = async_client.get(
+        "/shows/?type=Movie", headers={"If-None-Match": _hit.headers["ETag"]}
+    )
+    assert _not_modified.status_code == 304
+
+    # a write through the mounted Flask app drops the entry
+    _show = {**async_client.get("/shows/s3").json(), "title": "Baking Show"}
+    for _derived in ("duration_minutes", "seasons"):
+        del _show[_derived]
+    assert async_client.post("/shows/", json=_show).status_code == 200
+    _miss = async_client.get("/shows/s3")
+    assert _miss.headers["X-Cache"] == "MISS"
+    assert _miss.json()["title"] == "Baking Show"
+
+
+def test_compression(async_client, monkeypatch):
+    monkeypatch.setattr(main.compression, "min_bytes", 0)
+    _response = async_client.get(
+        "/shows/", headers={"Accept-Encoding": "gzip"}, params={"per_page": 3}
+    )
+    assert _response.headers["Content-Encoding"] == "gzip"
+    assert _response.headers["ETag"].startswith("W/")
+    # the test client decodes the body itself
+    assert [r["show_id"] for r in _response.json()] == ["s1", "s2", "s3"]
+
+
+def test_flask_routes_are_mounted(async_client):
+    assert async_client.get("/shows/summary").status_code == 200
+    assert async_client.get("/shows/export").status_code == 200
+    assert async_client.get("/swagger.json").json()["info"]["title"] == "Interview API"
+
+
+def test_memory_catalog_stays_on_flask(client, memory_catalog):
+    memory_catalog()
+    with TestClient(asgi.create_app()) as _client:
+        _response = _client.get("/shows/?per_page=2")
+    # Flask's after_request metrics header, the async handlers don't set one
+    assert "Server-Timing" in _response.headers
+    assert [r["show_id"] for r in _response.json()] == ["s1", "s2"]
+
+
+def test_async_database_url(monkeypatch):
+    monkeypatch.delenv("ASYNC_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DATABASE_URL", "postgresql+pg8000://u:p@db/netflix")
+    assert str(asgi.async_database_url()) == "postgresql+asyncpg://u:p@db/netflix"
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///netflix.db")
+    assert str(asgi.async_database_url()) == "sqlite+aiosqlite:///netflix.db"
+    monkeypatch.delenv("DATABASE_URL")
+    _url = asgi.async_database_url()
+    assert _url.drivername == "postgresql+asyncpg"
+    assert _url.query["host"] == f"/cloudsql/{main.INSTANCE_CONNECTION_NAME}"
+    monkeypatch.setenv("ASYNC_DATABASE_URL", "postgresql+asyncpg://other/db")
+    assert str(asgi.async_database_url()) == "postgresql+asyncpg://other/db"
+
+
+def test_async_pool_options(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    _options = asgi.async_pool_options(asgi.async_database_url())
+    assert _options["poolclass"] is asgi.AsyncAdaptedQueuePool
+    assert _options["pool_size"] == 3
+    assert "connect_args" not in _options
@@ -0,0 +1,65 @@
+import pytest
+
+import main
+
+
+@pytest.fixture(params=("database", "memory"))
+def backend(request, client, memory_catalog):
+    if request.param == "memory":
+        memory_catalog()
+    return client
+
+
+def _batch_get(client, body):
+    return client.post("/shows/batch-get", json=body)
+
+
+def test_results_follow_the_request_order(backend):
+    _response = _batch_get(backend, {"show_ids": ["s3", "s1", "s2"]})
+    assert _response.status_code == 200
+    _body = _response.get_json()
+    assert [r["show_id"] for r in _body["results"]] == ["s3", "s1", "s2"]
+    assert _body["missing"] == []
+    assert _body["results"][0] == backend.get("/shows/s3").get_json()
+
+
+def test_duplicates_and_missing_ids(backend):
+    _body = _batch_get(
+        backend, {"show_ids": ["s2", "nope", "s2", 7, "s1", "nope"], "fields": "title"}
+    ).get_json()
+    assert _body["results"] == [{"title": "Escape Room"}, {"title": "The Great Escape"}]
+    assert _body["missing"] == ["nope", "7"]
+
+
+def test_empty_request(backend):
+    assert _batch_get(backend, {"show_ids": []}).get_json() == {
+        "success": True,
+        "results": [],
+        "missing": [],
+    }
+
+
+@pytest.mark.parametrize(
+    "body",
+    (None, [], {"ids": ["s1"]}, {"show_ids": "s1"}, {"show_ids": ["s1"], "fields": ["nope"]}),
+)
+def test_malformed_requests(backend, body):
+    assert _batch_get(backend, body).status_code == 400
+
+
+def test_at_most_max_batch_get_ids(backend, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BATCH_GET", 3)
+    _ids = ["s1", "s2", "s3", "s4"]
+    assert _batch_get(backend, {"show_ids": _ids}).status_code == 400
+    # duplicates count once
+    _response = _batch_get(backend, {"show_ids": _ids[:3] * 2})
+    assert _response.status_code == 200
+    assert len(_response.get_json()["results"]) == 3
+
+
+def test_catalog_lookup(client, memory_catalog):
+    memory_catalog()
+    _catalog = main.catalog.get()
+    _positions = _catalog.lookup(["s2", "nope", "s1"])
+    assert list(_positions) == ["s2", "s1"]
+    assert main.fetch_shows(["s2", "nope"], ["title"]) == {"s2": {"title": "Escape Room"}}
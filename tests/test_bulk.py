@@ -0,0 +1,82 @@
+import functools
+
+import main
+from bulk import batched
+
+
+def _required(show:dict) -> dict:
+    return {
+        k: show[k]
+        for k in (
+            "show_id",
+            "type",
+            "title",
+            "date_added",
+            "release_year",
+            "rating",
+            "duration",
+            "description",
+        )
+    }
+
+
+def test_an_update_keeps_the_columns_it_leaves_out(client):
+    _show = client.get("/shows/s1").get_json()
+    _response = client.post("/shows/bulk", json=[{**_required(_show), "rating": "R"}])
+    assert _response.get_json()["updated"] == 1
+
+    _stored = client.get("/shows/s1").get_json()
+    assert _stored["rating"] == "R"
+    for _column in ("director", "cast", "country", "listed_in"):
+        assert _stored[_column] == _show[_column]
+    assert _stored["duration_minutes"] == 90
+
+
+def test_an_explicit_null_still_clears_a_column(client):
+    _show = client.get("/shows/s1").get_json()
+    client.post("/shows/bulk", json=[{**_required(_show), "director": None}])
+    assert client.get("/shows/s1").get_json()["director"] is None
+
+
+def test_a_show_repeated_across_batches_is_counted_once(client, monkeypatch):
+    monkeypatch.setattr(main, "batched", functools.partial(batched, size=2))
+    _show = _required(client.get("/shows/s1").get_json())
+    _rows = [
+        {**_show, "show_id": "s9", "title": "First"},
+        {**_show, "title": "Updated"},
+        {**_show, "show_id": "s9", "title": "Second"},
+        {**_show, "show_id": "s9", "title": "Third"},
+    ]
+    _body = client.post("/shows/bulk", json=_rows).get_json()
+
+    assert (_body["inserted"], _body["updated"], _body["failed"]) == (1, 1, 0)
+    assert _body["results"] == [
+        {"show_id": "s9", "status": "inserted"},
+        {"show_id": "s1", "status": "updated"},
+    ]
+    assert client.get("/shows/s9").get_json()["title"] == "Third"
+
+
+def test_rows_of_the_wrong_types_fail_on_their_own(client):
+    _show = _required(client.get("/shows/s1").get_json())
+    _rows = [
+        {**_show, "show_id": "s5", "date_added": 20200101},
+        {**_show, "show_id": "s6", "title": ["A", "B"]},
+        {**_show, "show_id": "s7", "cast": [1, 2]},
+        {**_show, "show_id": "s8", "release_year": "next year"},
+        {**_show, "show_id": ["s9"]},
+        {**_show, "show_id": "s10", "title": "Fine"},
+    ]
+    _response = client.post("/shows/bulk", json=_rows)
+    assert _response.status_code == 200
+    _body = _response.get_json()
+    assert (_body["inserted"], _body["updated"], _body["failed"]) == (1, 0, 5)
+    assert [(r["show_id"], r["status"]) for r in _body["results"]] == [
+        ("s5", "failed"),
+        ("s6", "failed"),
+        ("s7", "failed"),
+        ("s8", "failed"),
+        (["s9"], "failed"),
+        ("s10", "inserted"),
+    ]
+    assert client.get("/shows/s7").status_code == 404
@@ -0,0 +1,64 @@
+import gzip
+import json
+
+import brotli
+import pytest
+
+import main
+
+DECODERS = {"gzip": gzip.decompress, "br": brotli.decompress}
+
+
+@pytest.fixture
+def no_threshold(monkeypatch):
+    monkeypatch.setattr(main.compression, "min_bytes", 0)
+
+
+def test_small_bodies_are_sent_as_is(client, monkeypatch):
+    _size = len(client.get("/shows/s1").data)
+    monkeypatch.setattr(main.compression, "min_bytes", _size + 1)
+    _response = client.get("/shows/s1", headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in _response.headers
+    assert "Accept-Encoding" in _response.headers["Vary"]
+    assert _response.get_json()["show_id"] == "s1"
+
+    monkeypatch.setattr(main.compression, "min_bytes", _size)
+    _response = client.get("/shows/s1", headers={"Accept-Encoding": "gzip"})
+    assert _response.headers["Content-Encoding"] == "gzip"
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    (("gzip, br", "br"), ("gzip", "gzip"), ("br;q=0.5, gzip", "gzip"), ("identity", None)),
+)
+def test_negotiated_encoding(client, no_threshold, accept_encoding, encoding):
+    _plain = client.get("/shows/").data
+    _response = client.get("/shows/", headers={"Accept-Encoding": accept_encoding})
+    assert _response.headers.get("Content-Encoding") == encoding
+    if encoding is None:
+        assert _response.data == _plain
+    else:
+        assert DECODERS[encoding](_response.data) == _plain
+        assert int(_response.headers["Content-Length"]) == len(_response.data)
+
+
+def test_compressed_responses_have_a_weak_etag(client, no_threshold):
+    _response = client.get("/shows/s1", headers={"Accept-Encoding": "gzip"})
+    _etag = _response.headers["ETag"]
+    assert _etag.startswith('W/"')
+    _not_modified = client.get(
+        "/shows/s1", headers={"Accept-Encoding": "gzip", "If-None-Match": _etag}
+    )
+    assert _not_modified.status_code == 304
+    assert "Content-Encoding" not in _not_modified.headers
+
+
+@pytest.mark.parametrize("encoding", DECODERS)
+def test_streamed_exports_are_compressed(client, encoding):
+    _plain = client.get("/shows/export").data
+    _response = client.get("/shows/export", headers={"Accept-Encoding": encoding})
+    assert _response.headers["Content-Encoding"] == encoding
+    assert "Content-Length" not in _response.headers
+    _body = DECODERS[encoding](_response.data)
+    assert _body == _plain
+    assert [json.loads(l)["show_id"] for l in _body.splitlines()] == ["s1", "s2", "s3"]
@@ -0,0 +1,63 @@
+import base64
+import json
+
+import pytest
+
+
+def _walk(client, url:str) -> list:
+    """The show_ids of every page, following X-Next-Cursor from an empty cursor."""
+    _pages = []
+    _cursor = ""
+    while _cursor is not None:
+        _response = client.get(f"{url}&cursor={_cursor}")
+        assert _response.status_code == 200, _response.data
+        _pages.append([r["show_id"] for r in _response.get_json()])
+        _cursor = _response.headers.get("X-Next-Cursor")
+    return _pages
+
+
+def _token(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize("backend", ("database", "memory"))
+def test_walking_the_pages(client, memory_catalog, backend):
+    if backend == "memory":
+        memory_catalog()
+    assert _walk(client, "/shows/?per_page=2") == [["s1", "s2"], ["s3"]]
+    assert _walk(client, "/shows/?per_page=1&sort_by=title&sort_direction=desc") == [
+        ["s1"],
+        ["s2"],
+        ["s3"],
+    ]
+    assert _walk(client, "/shows/?per_page=2&sort_by=date_added") == [
+        ["s1", "s3"],
+        ["s2"],
+    ]
+    # the last page has no cursor even when it is full
+    _response = client.get("/shows/?per_page=3&cursor=")
+    assert len(_response.get_json()) == 3
+    assert "X-Next-Cursor" not in _response.headers
+
+
+@pytest.mark.parametrize("backend", ("database", "memory"))
+def test_bad_and_mismatched_cursors(client, memory_catalog, backend):
+    if backend == "memory":
+        memory_catalog()
+    _title_cursor = client.get("/shows/?per_page=1&sort_by=title&cursor=").headers[
+        "X-Next-Cursor"
+    ]
+    for _url in (
+        f"/shows/?sort_by=release_year&cursor={_title_cursor}",
+        f"/shows/?sort_by=title&sort_direction=desc&cursor={_title_cursor}",
+        "/shows/?cursor=not-a-cursor",
+        f"/shows/?cursor={_token('show_id', 'asc', 's1')}",
+        f"/shows/?sort_by=release_year&cursor={_token('release_year', 'asc', 'x', 's1')}",
+        f"/shows/?sort_by=date_added&cursor={_token('date_added', 'asc', 'x', 's1')}",
+        # a cursor needs a sort key without NULLs
+        "/shows/?sort_by=duration_minutes&cursor=",
+        "/shows/?sort_by=unknown&cursor=",
+    ):
+        assert client.get(_url).status_code == 400, _url
+    _response = client.get(f"/shows/?sort_by=title&cursor={_title_cursor}")
+    assert _response.status_code == 200
@@ -0,0 +1,89 @@
+import pytest
+
+import main
+from backfill_durations import backfill
+from durations import parse_duration
+
+
+@pytest.mark.parametrize(
+    "duration, expected",
+    (
+        ("90 min", (90, None)),
+        (" 125 MIN", (125, None)),
+        ("1 Season", (None, 1)),
+        ("3 Seasons", (None, 3)),
+        ("", (None, None)),
+        (None, (None, None)),
+        ("two hours", (None, None)),
+        ("90 minutes", (None, None)),
+    ),
+)
+def test_parse_duration(duration, expected):
+    assert parse_duration(duration) == expected
+
+
+def test_assigning_duration_derives_the_numeric_columns():
+    _show = main.Show(
+        "x1", "Movie", "X", None, None, None, None, 2000, "PG", "90 min", None, ""
+    )
+    assert (_show.duration_minutes, _show.seasons) == (90, None)
+    _show.duration = "4 Seasons"
+    assert (_show.duration_minutes, _show.seasons) == (None, 4)
+    _show.duration = "unknown"
+    assert (_show.duration_minutes, _show.seasons) == (None, None)
+
+
+def test_writes_derive_the_numeric_columns(client):
+    _show = client.get("/shows/s1").get_json()
+    # the derived columns are never taken from the client
+    _update = {**_show, "duration": "3 Seasons", "duration_minutes": 7, "seasons": 7}
+    assert client.post("/shows/", json=_update).status_code == 200
+    _updated = client.get("/shows/s1").get_json()
+    assert (_updated["duration_minutes"], _updated["seasons"]) == (None, 3)
+
+    _row = {**client.get("/shows/s3").get_json(), "duration": "95 min", "seasons": 1}
+    _response = client.post("/shows/bulk", json=[_row])
+    assert _response.get_json()["updated"] == 1
+    _updated = client.get("/shows/s3").get_json()
+    assert (_updated["duration_minutes"], _updated["seasons"]) == (95, None)
+
+
+# query -> the matching show_ids, in show_id order
+FILTERS = {
+    "duration_minutes_min=95": ["s3"],
+    "duration_minutes_max=95": ["s1"],
+    "duration_minutes_min=90&duration_minutes_max=100": ["s1", "s3"],
+    "seasons_min=2": ["s2"],
+    "seasons_max=1": [],
+    "seasons_min=1&duration_minutes_min=1": [],
+}
+
+
+@pytest.mark.parametrize("backend", ("database", "memory"))
+@pytest.mark.parametrize("query", FILTERS)
+def test_duration_filters(client, memory_catalog, backend, query):
+    if backend == "memory":
+        memory_catalog()
+    _response = client.get(f"/shows/?{query}")
+    assert _response.status_code == 200, _response.data
+    assert [r["show_id"] for r in _response.get_json()] == FILTERS[query]
+
+
+@pytest.mark.parametrize("query", ("duration_minutes_min=long", "seasons_max=2.5"))
+def test_malformed_duration_filters_are_a_400(client, query):
+    assert client.get(f"/shows/?{query}").status_code == 400
+
+
+def test_backfill(client):
+    _table = main.Show.__table__
+    with main.db.engine.begin() as _connection:
+        _connection.execute(_table.update().values(duration_minutes=None, seasons=None))
+    assert backfill(main.db.engine, _table, batch_size=2) == 3
+    # rows that have either column are skipped
+    assert backfill(main.db.engine, _table, batch_size=2) == 0
+    _shows = {s: client.get(f"/shows/{s}").get_json() for s in ("s1", "s2", "s3")}
+    assert {s: (r["duration_minutes"], r["seasons"]) for s, r in _shows.items()} == {
+        "s1": (90, None),
+        "s2": (None, 2),
+        "s3": (100, None),
+    }
@@ -0,0 +1,22 @@
+import csv
+import io
+import json
+
+import main
+
+
+def test_export_pages_through_the_catalog_in_batches(client, monkeypatch):
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 2)
+    _response = client.get("/shows/export")
+    assert _response.status_code == 200
+    _rows = [json.loads(line) for line in _response.get_data(as_text=True).splitlines()]
+    assert [r["show_id"] for r in _rows] == ["s1", "s2", "s3"]
+    assert _rows[1]["country"] == ["India", "United States"]
+
+
+def test_export_csv_with_a_filter(client, monkeypatch):
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 1)
+    _response = client.get("/shows/export?format=csv&cast=Ryan Reynolds")
+    _rows = list(csv.DictReader(io.StringIO(_response.get_data(as_text=True))))
+    assert [r["show_id"] for r in _rows] == ["s1", "s2"]
+    assert _rows[0]["cast"] == "Ryan Reynolds, Bo Chen"
@@ -0,0 +1,57 @@
+import pytest
+
+# query -> the matching show_ids, in show_id order
+FILTERS = {
+    "release_year=2005": ["s3"],
+    "release_year_min=2005": ["s2", "s3"],
+    "release_year_max=2005": ["s1", "s3"],
+    "release_year_min=2000&release_year_max=2010": ["s3"],
+    "release_year_min=2006&release_year_max=2005": [],
+    "date_added=2020": ["s1", "s3"],
+    "date_added=2020-06": ["s3"],
+    "date_added=2020-01-02": ["s1"],
+    "date_added=2021-03": ["s2"],
+    # both ends are inclusive, to the end of a partial date
+    "date_added_from=2020-06-01": ["s2", "s3"],
+    "date_added_to=2020-06-01": ["s1", "s3"],
+    "date_added_from=2020-01-02&date_added_to=2020-01-02": ["s1"],
+    "date_added_from=2020-02&date_added_to=2021": ["s2", "s3"],
+    "date_added=2020&date_added_from=2020-03": ["s3"],
+}
+
+MALFORMED = (
+    "release_year=soon",
+    "release_year_min=1.5",
+    "release_year_max=99999999999999999999",
+    "release_year_min=-99999999999999999999",
+    "date_added=2020-13",
+    "date_added=2020-02-30",
+    "date_added=yesterday",
+    "date_added_from=2020/01/01",
+    "date_added_to=2020-01-01-01",
+)
+
+
+def _show_ids(client, query:str) -> list:
+    _response = client.get(f"/shows/?{query}")
+    assert _response.status_code == 200, _response.data
+    return [r["show_id"] for r in _response.get_json()]
+
+
+@pytest.mark.parametrize("backend", ("database", "memory"))
+@pytest.mark.parametrize("query", FILTERS)
+def test_year_and_date_filters(client, memory_catalog, backend, query):
+    if backend == "memory":
+        memory_catalog()
+    assert _show_ids(client, query) == FILTERS[query]
+
+
+@pytest.mark.parametrize("backend", ("database", "memory"))
+@pytest.mark.parametrize("query", MALFORMED)
+def test_malformed_filters_are_a_400(client, memory_catalog, backend, query):
+    if backend == "memory":
+        memory_catalog()
+    _response = client.get(f"/shows/?{query}")
+    assert _response.status_code == 400
+    assert query.split("=")[0] in _response.get_json()["message"]
+    assert client.get(f"/shows/export?{query}").status_code == 400
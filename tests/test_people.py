@@ -0,0 +1,32 @@
+def test_top_people(client):
+    _response = client.get("/people/?top=2")
+    assert _response.status_code == 200
+    assert _response.get_json() == [
+        {"name": "Ryan Reynolds", "shows": 2},
+        {"name": "Ann Lee", "shows": 1},
+    ]
+
+
+def test_top_people_by_role(client):
+    _response = client.get("/people/?role=director")
+    assert _response.get_json() == [
+        {"name": "Ann Lee", "shows": 1},
+        {"name": "Cy Diaz", "shows": 1},
+    ]
+    assert client.get("/people/?role=producer").status_code == 400
+
+
+def test_person_shows(client):
+    _response = client.get("/people/Ryan Reynolds/shows?fields=show_id")
+    assert _response.status_code == 200
+    assert _response.get_json() == [{"show_id": "s1"}, {"show_id": "s2"}]
+    assert client.get("/people/Ryan Reynolds/shows?role=director").get_json() == []
+
+
+def test_array_filters_use_the_people_links(client):
+    _ids = lambda r: [s["show_id"] for s in r.get_json()]
+    assert _ids(client.get("/shows/?cast=Ryan Reynolds&cast=Bo Chen")) == ["s1"]
+    assert _ids(client.get("/shows/?cast=Bo Chen&cast=Zoe Park&match=any")) == ["s1", "s3"]
+    # an update relinks the show
+    client.post("/shows/", json={**client.get("/shows/s3").get_json(), "cast": ["Ryan Reynolds"]})
+    assert _ids(client.get("/shows/?cast=Ryan Reynolds")) == ["s1", "s2", "s3"]
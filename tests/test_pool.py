@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from pool import PoolMetrics, TimedQueuePool, pool_options_from_env, warm_up
+
+
+def test_in_memory_sqlite_keeps_flask_sqlalchemy_defaults():
+    assert pool_options_from_env("sqlite:///:memory:") == {}
+
+
+def test_options_from_env(monkeypatch):
+    for _name, _value in {
+        "DB_POOL_SIZE": "3",
+        "DB_MAX_OVERFLOW": "1",
+        "DB_POOL_TIMEOUT": "2.5",
+        "DB_POOL_RECYCLE": "60",
+        "DB_POOL_PRE_PING": "0",
+    }.items():
+        monkeypatch.setenv(_name, _value)
+    assert pool_options_from_env("postgresql+pg8000://u:p@db/netflix") == {
+        "poolclass": TimedQueuePool,
+        "pool_size": 3,
+        "max_overflow": 1,
+        "pool_timeout": 2.5,
+        "pool_recycle": 60,
+        "pool_pre_ping": False,
+    }
+    _options = pool_options_from_env("sqlite:///netflix.db")
+    assert _options["connect_args"] == {"check_same_thread": False}
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.01")
+    _uri = f"sqlite:///{tmp_path / 'pool.db'}"
+    _engine = create_engine(_uri, **pool_options_from_env(_uri))
+    yield _engine
+    _engine.dispose()
+
+
+def test_warm_up_fills_the_pool(engine):
+    _metrics = PoolMetrics(engine)
+    assert warm_up(engine, 2) == 2
+    _stats = _metrics.snapshot()
+    assert (_stats["connects"], _stats["checked_in"], _stats["checked_out"]) == (2, 2, 0)
+    # served from the pool, nothing new is opened
+    with engine.connect():
+        pass
+    assert _metrics.snapshot()["connects"] == 2
+
+
+def test_warm_up_from_env(engine, monkeypatch):
+    monkeypatch.setenv("DB_POOL_WARMUP", "1")
+    assert warm_up(engine) == 1
+    monkeypatch.delenv("DB_POOL_WARMUP")
+    assert warm_up(engine) == 0
+
+
+def test_warm_up_stops_at_the_pool_limit(engine):
+    # the third connection times out, the two opened are kept
+    assert warm_up(engine, 3) == 2
+    assert engine.pool.checkedin() == 2
+
+
+def test_only_waits_count_as_timeouts(engine):
+    _held = [engine.connect(), engine.connect()]
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    for _connection in _held:
+        _connection.close()
+    _stats = PoolMetrics(engine).snapshot()
+    assert (_stats["checkouts"], _stats["checkout_timeouts"]) == (3, 1)
+
+
+def test_connect_failures_are_not_timeouts():
+    def _refuse():
+        raise sqlite3.OperationalError("connection refused")
+
+    _engine = create_engine("sqlite://", creator=_refuse, poolclass=TimedQueuePool)
+    with pytest.raises(exc.OperationalError):
+        _engine.connect()
+    assert warm_up(_engine, 1) == 0
+    _stats = PoolMetrics(_engine).snapshot()
+    assert (_stats["checkouts"], _stats["checkout_timeouts"]) == (2, 0)
@@ -0,0 +1,59 @@
+def _ids(response):
+    return [s["show_id"] for s in response.get_json()]
+
+
+def test_differently_cased_sort_direction_shares_the_descending_page(client):
+    assert _ids(client.get("/shows/?sort_direction=DESC")) == ["s3", "s2", "s1"]
+    _cached = client.get("/shows/?sort_direction=desc")
+    assert _cached.headers["X-Cache"] == "HIT"
+    assert _ids(_cached) == ["s3", "s2", "s1"]
+
+
+def test_differently_cased_match_and_sort_by(client):
+    assert _ids(client.get("/shows/?country=India&country=France&match=ANY")) == ["s2", "s3"]
+    assert _ids(client.get("/shows/?sort_by=TITLE")) == ["s3", "s2", "s1"]
+
+
+def test_differently_cased_group_by(client):
+    _results = client.get("/shows/summary?group_by=TYPE").get_json()["results"]
+    assert {r["type"]: r["count"] for r in _results} == {"Movie": 2, "TV Show": 1}
+
+
+def test_differently_cased_names_are_other_parameters(client):
+    # the handlers ignore SORT_BY and Type, they mustn't share an entry with
+    # sort_by and type
+    assert _ids(client.get("/shows/?SORT_BY=title")) == ["s1", "s2", "s3"]
+    _response = client.get("/shows/?sort_by=title")
+    assert _response.headers["X-Cache"] == "MISS"
+    assert _ids(_response) == ["s3", "s2", "s1"]
+
+    assert _ids(client.get("/shows/?Type=TV Show")) == ["s1", "s2", "s3"]
+    assert _ids(client.get("/shows/?type=TV Show")) == ["s2"]
+
+
+def test_a_matching_etag_is_not_modified(client):
+    _response = client.get("/shows/s1")
+    _etag = _response.headers["ETag"]
+    assert _response.headers["X-Cache"] == "MISS"
+
+    _not_modified = client.get("/shows/s1", headers={"If-None-Match": _etag})
+    assert _not_modified.status_code == 304
+    assert _not_modified.headers["ETag"] == _etag
+    assert not _not_modified.data
+    # compressed responses carry the weak form of the ETag
+    _weak = client.get("/shows/s1", headers={"If-None-Match": f"W/{_etag}"})
+    assert _weak.status_code == 304
+    assert client.get("/shows/s1", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_a_write_invalidates_the_cache(client):
+    _etag = client.get("/shows/s1").headers["ETag"]
+    assert client.get("/shows/s1").headers["X-Cache"] == "HIT"
+
+    _show = client.get("/shows/s1").get_json()
+    assert client.post("/shows/", json={**_show, "rating": "R"}).status_code == 200
+
+    _response = client.get("/shows/s1", headers={"If-None-Match": _etag})
+    assert _response.status_code == 200
+    assert _response.headers["X-Cache"] == "MISS"
+    assert _response.get_json()["rating"] == "R"
@@ -0,0 +1,31 @@
+import main
+from search import apply_search
+
+
+def _show_ids(response) -> list:
+    return sorted(r["show_id"] for r in response.get_json())
+
+
+def test_search_ranks_and_filters(client):
+    _response = client.get("/shows/?q=escape")
+    assert _response.status_code == 200
+    assert _show_ids(_response) == ["s1", "s2"]
+
+
+def test_a_query_without_words_is_ignored(client):
+    for _q in ("%20%20", "!!!", "%22", "-"):
+        _response = client.get(f"/shows/?q={_q}")
+        assert _response.status_code == 200, _q
+        assert _show_ids(_response) == ["s1", "s2", "s3"]
+
+
+def test_the_postgres_search_compiles_for_pg8000(client):
+    from pg8000.dbapi import convert_paramstyle
+    from sqlalchemy.dialects.postgresql import pg8000
+
+    _query, _ = apply_search(main.Show.query, main.Show, "escape", "postgresql")
+    _compiled = _query.statement.compile(dialect=pg8000.dialect())
+    _sql, _ = convert_paramstyle(
+        "format", str(_compiled), [_compiled.params[p] for p in _compiled.positiontup]
+    )
+    assert "shows_v3.title % $" in _sql
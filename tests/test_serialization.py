@@ -0,0 +1,66 @@
+import datetime
+
+import msgpack
+import pytest
+
+from serialization import COLUMNAR_JSON, columnar, dumps
+
+
+def test_columnar():
+    assert columnar([{"a": 1, "b": 2}, {"a": 3}]) == {"a": [1, 3], "b": [2, None]}
+    assert columnar({"results": [{"a": 1}], "missing": ["x"]}) == {
+        "results": {"a": [1]},
+        "missing": ["x"],
+    }
+    assert columnar({"a": 1}) == {"a": 1}
+    assert columnar([]) == {}
+
+
+def test_dates_are_iso_8601():
+    assert dumps({"d": datetime.date(2020, 1, 2)}) == b'{"d":"2020-01-02"}'
+
+
+def test_columnar_list(client):
+    _response = client.get(
+        "/shows/?fields=show_id,seasons", headers={"Accept": COLUMNAR_JSON}
+    )
+    assert _response.mimetype == COLUMNAR_JSON
+    assert "Accept" in _response.headers["Vary"]
+    assert _response.get_json(force=True) == {
+        "show_id": ["s1", "s2", "s3"],
+        "seasons": [None, 2, None],
+    }
+
+
+def test_columnar_batch_get(client):
+    _response = client.post(
+        "/shows/batch-get",
+        json={"show_ids": ["s2", "nope"], "fields": ["title"]},
+        headers={"Accept": COLUMNAR_JSON},
+    )
+    assert _response.get_json(force=True) == {
+        "success": True,
+        "results": {"title": ["Escape Room"]},
+        "missing": ["nope"],
+    }
+
+
+@pytest.mark.parametrize("mimetype", ("application/msgpack", "application/x-msgpack"))
+def test_msgpack(client, mimetype):
+    _response = client.get("/shows/s1", headers={"Accept": mimetype})
+    assert _response.mimetype == mimetype
+    assert msgpack.unpackb(_response.data) == client.get("/shows/s1").get_json()
+
+
+def test_formats_have_their_own_cache_entries(client):
+    assert client.get("/shows/s1").headers["X-Cache"] == "MISS"
+    _response = client.get("/shows/s1", headers={"Accept": "application/msgpack"})
+    assert _response.headers["X-Cache"] == "MISS"
+    assert msgpack.unpackb(_response.data)["show_id"] == "s1"
+    assert client.get("/shows/s1").mimetype == "application/json"
+
+
+def test_unknown_formats_get_json(client):
+    _response = client.get("/shows/s1", headers={"Accept": "text/html"})
+    assert _response.mimetype == "application/json"
+    assert _response.get_json()["show_id"] == "s1"
@@ -0,0 +1,50 @@
+import datetime
+
+import sqlalchemy
+
+import main
+from suggest import SuggestIndex
+
+
+def test_suggest_titles_and_people(client):
+    _response = client.get("/shows/suggest?prefix=esc")
+    assert _response.get_json() == [
+        {"kind": "title", "value": "Escape Room", "show_id": "s2"},
+        {"kind": "title", "value": "The Great Escape", "show_id": "s1"},
+    ]
+    _people = client.get("/shows/suggest?prefix=ryan").get_json()
+    assert _people == [{"kind": "person", "value": "Ryan Reynolds", "shows": 2}]
+
+
+def test_the_index_reads_the_database_on_first_use():
+    # migrate.py imports main before the shows table exists
+    _engine = sqlalchemy.create_engine("sqlite://")
+    _index = SuggestIndex.from_database(_engine, main.Show.__table__)
+    main.Show.__table__.create(_engine)
+    with _engine.begin() as _connection:
+        _connection.execute(
+            main.Show.__table__.insert(),
+            {
+                "show_id": "s1",
+                "type": "Movie",
+                "title": "Later",
+                "date_added": datetime.date(2020, 1, 1),
+                "release_year": 2020,
+                "rating": "PG",
+                "duration": "90 min",
+                "description": "",
+            },
+        )
+    assert [m["value"] for m in _index.suggest("lat")] == ["Later"]
+
+
+def test_values_that_arent_text_are_skipped():
+    _index = SuggestIndex()
+    _index.load([{"show_id": "s1", "title": "Alpha", "director": None, "cast": ["Al"]}])
+    _index.update(
+        [
+            {"show_id": "s1", "title": ["Alpha"], "director": "Al", "cast": [1, "Ann"]},
+            {"show_id": "s2", "title": 2, "director": [None], "cast": None},
+        ]
+    )
+    assert _index.suggest("a") == [{"kind": "person", "value": "Ann", "shows": 1}]
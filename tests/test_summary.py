@@ -0,0 +1,97 @@
+import main
+import sqlalchemy
+
+from summary import apply_summary_changes, refresh_summaries
+
+
+def test_default_summary_from_the_database(client):
+    _response = client.get("/shows/summary")
+    assert _response.status_code == 200
+    assert _response.headers["X-Summary-Source"] == "precomputed"
+    assert sorted(
+        (r["type"], r["rating"], r["count"]) for r in _response.get_json()["results"]
+    ) == [("Movie", "PG", 1), ("Movie", "PG-13", 1), ("TV Show", "TV-MA", 1)]
+
+
+def test_live_summary_with_a_filter(client):
+    _response = client.get("/shows/summary?group_by=type&filter_column=cast&filter_value=Ryan Reynolds")
+    assert _response.status_code == 200
+    assert _response.headers["X-Summary-Source"] == "live"
+    assert sorted(
+        (r["type"], r["count"]) for r in _response.get_json()["results"]
+    ) == [("Movie", 1), ("TV Show", 1)]
+
+
+def test_summary_of_an_array_column_counts_elements(client):
+    _response = client.get("/shows/summary?group_by=country")
+    assert {r["country"]: r["count"] for r in _response.get_json()["results"]} == {
+        "United States": 2,
+        "India": 1,
+        "France": 1,
+    }
+
+
+def _summary(client, group_by:str) -> dict:
+    _rows = client.get(f"/shows/summary?group_by={group_by}").get_json()["results"]
+    return {tuple(r[c] for c in group_by.split(",")): r["count"] for r in _rows}
+
+
+def test_writes_move_the_summary_counts(client):
+    _show = client.get("/shows/s3").get_json()
+    _update = {**_show, "rating": "TV-MA", "country": ["India"], "listed_in": None}
+    assert client.post("/shows/", json=_update).status_code == 200
+    _new = {**_show, "show_id": "s4", "rating": "PG-13", "country": ["India"]}
+    assert client.post("/shows/", json=_new).status_code == 200
+
+    assert _summary(client, "type,rating") == {
+        ("Movie", "PG-13"): 2,
+        ("Movie", "TV-MA"): 1,
+        ("TV Show", "TV-MA"): 1,
+    }
+    assert _summary(client, "country") == {("United States",): 2, ("India",): 3}
+    assert ("Documentaries",) in _summary(client, "listed_in")
+
+    # the same as rebuilding from scratch
+    _groupings = ("type,rating", "type,release_year", "country", "listed_in")
+    _incremental = {g: _summary(client, g) for g in _groupings}
+    with main.app.app_context():
+        refresh_summaries(main.db.session, main.Show, main.SUMMARY_TABLES)
+        main.db.session.commit()
+        main.catalog_changed()
+    assert {g: _summary(client, g) for g in _groupings} == _incremental
+
+
+def test_top_limits_the_groups(client):
+    _response = client.get("/shows/summary?group_by=country&top=1")
+    assert [(r["country"], r["count"]) for r in _response.get_json()["results"]] == [
+        ("United States", 2)
+    ]
+    for _top in ("0", "-1"):
+        assert client.get(f"/shows/summary?top={_top}").status_code == 400
+        assert client.get(f"/shows/summary?group_by=title&top={_top}").status_code == 400
+
+
+def test_null_groups_are_updated_and_deleted(client):
+    # a database loaded before the NOT NULL constraints can hold NULL ratings
+    _grouping = frozenset(("type", "rating"))
+    _table = main.SUMMARY_TABLES[_grouping]
+    _columns = [c.name for c in _table.columns if c.name != "count"]
+    _group = tuple("Movie" if c == "type" else None for c in _columns)
+    _tables = {_grouping: _table}
+
+    def _counts():
+        _rows = main.db.session.execute(sqlalchemy.select(_table))
+        return {tuple(r[:-1]): r[-1] for r in _rows if None in tuple(r[:-1])}
+
+    with main.app.app_context():
+        for _before, _after, _expected in (
+            ({}, {_group: 1}, {_group: 1}),
+            ({_group: 1}, {_group: 3}, {_group: 3}),
+            ({_group: 2}, {}, {_group: 1}),
+            ({_group: 1}, {}, {}),
+        ):
+            apply_summary_changes(
+                main.db.session, _tables, {_grouping: _before}, {_grouping: _after}
+            )
+            assert _counts() == _expected
+        main.db.session.rollback()
@@ -0,0 +1,66 @@
+import pytest
+
+import loader
+import main
+import wrangling
+
+TITLES_CSV = """\
+show_id,type,title,director,cast,country,date_added,release_year,rating,duration,listed_in,description
+c1,Movie,"Dick Johnson Is Dead",,,United States,"September 25, 2021",2020,PG-13,90 min,Documentaries,"A film, with commas"
+c2,TV Show,Blood & Water,,"Ama Qamata, Khosi Ngema",South Africa,"September 24, 2021",2021,TV-MA,2 Seasons,"International TV Shows, TV Dramas",Secrets
+c1,Movie,"Dick Johnson Is Dead",Kirsten Johnson,,United States,"September 25, 2021",2020,PG-13,91 min,Documentaries,"Again, later"
+"""
+
+
+@pytest.fixture
+def titles_csv(tmp_path):
+    _path = tmp_path / "netflix_titles.csv"
+    _path.write_text(TITLES_CSV)
+    return str(_path)
+
+
+@pytest.mark.parametrize("chunksize", (1, 2, 10))
+def test_normalize(titles_csv, chunksize):
+    _tables = wrangling.normalize(titles_csv, chunksize)
+
+    _shows = _tables["shows"]
+    assert list(_shows["show_id"]) == ["c1", "c2", "c1"]
+    assert list(_shows["description"]) == [
+        "A film, with commas",
+        "Secrets",
+        "Again, later",
+    ]
+    assert _shows["director"].tolist() == [None, None, ["Kirsten Johnson"]]
+    assert _shows["cast"].tolist() == [None, ["Ama Qamata", "Khosi Ngema"], None]
+    assert _shows["listed_in"][1] == ["International TV Shows", "TV Dramas"]
+    assert _shows["duration_minutes"].isna().tolist() == [False, True, False]
+    assert _shows["seasons"][1] == 2
+
+    assert sorted(_tables["people"]["name"]) == [
+        "Ama Qamata",
+        "Khosi Ngema",
+        "Kirsten Johnson",
+    ]
+    assert len(_tables["show_people"]) == 3
+    # a name seen again, in a later chunk or not, keeps its first id
+    assert sorted(_tables["genres"]["name"]) == [
+        "Documentaries",
+        "International TV Shows",
+        "TV Dramas",
+    ]
+
+
+def test_load(client, titles_csv):
+    with main.app.app_context():
+        loader.load(titles_csv, chunksize=1)
+
+    # the last row of a repeated show_id wins
+    _show = client.get("/shows/c1").get_json()
+    assert (_show["director"], _show["cast"], _show["duration"]) == (
+        ["Kirsten Johnson"],
+        None,
+        "91 min",
+    )
+    assert client.get("/shows/c2").get_json()["cast"] == ["Ama Qamata", "Khosi Ngema"]
+    _people = client.get("/people/Kirsten Johnson/shows").get_json()
+    assert [s["show_id"] for s in _people] == ["c1"]
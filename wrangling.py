@@ -1,38 +1,184 @@
+"""Normalize netflix_titles.csv into show, people, genre and country tables.
+
+The CSV is read in chunks and every chunk is turned into its own slice of the
+output tables. Ids for people, genres and countries are assigned from lookup
+indexes that persist across chunks, so memory is bounded by the chunk size
+plus the number of distinct names, not by the size of the catalog.
+"""
+import argparse
 import os
-import pandas
-flattened = pandas.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "netflix_titles.csv"))
-
-flattened.cast = flattened.cast.str.split(',')
-flattened.director = flattened.director.str.split(',')
-flattened.country = flattened.country.str.split(',')
-flattened.listed_in = flattened.listed_in.str.split(',')
+import re
 
+import pandas
 
+from durations import DURATION_PATTERN
+
+CSV_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "netflix_titles.csv"
+)
+CHUNK_SIZE = 2000
+
+LIST_COLUMNS = ("director", "cast", "country", "listed_in")
+# columns of the csv that list people, and the role they play in the show
+PERSON_ROLES = {"director": "director", "cast": "cast"}
+CATEGORY_COLUMNS = ("type", "rating")
+
+
+def read_titles(path:str=CSV_PATH, chunksize:int=CHUNK_SIZE):
+    """Yield the raw csv as DataFrames of at most `chunksize` rows."""
+    yield from pandas.read_csv(path, dtype=str, chunksize=chunksize)
+
+
+def clean_shows(df:pandas.DataFrame) -> pandas.DataFrame:
+    """Typed copy of a raw chunk: list columns split into stripped lists."""
+    df = df.copy()
+    for column in df.columns:
+        if column not in LIST_COLUMNS:
+            df[column] = df[column].str.strip()
+    for column in LIST_COLUMNS:
+        # split once here, everything downstream explodes these lists
+        # as "string", the .str accessor refuses a column that is all NaN,
+        # e.g. a chunk without a single director
+        _elements = (
+            df[column].astype("string").str.split(",").explode().astype("string")
+        ).str.strip()
+        _elements = _elements[_elements.notna() & (_elements != "")]
+        _lists = _elements.groupby(level=0).agg(list).reindex(df.index)
+        df[column] = _lists.astype(object).where(_lists.notna(), None)
+    # e.g. "September 25, 2021"
+    df["date_added"] = pandas.to_datetime(
+        df["date_added"], format="%B %d, %Y", errors="coerce"
+    ).dt.date
+    df["release_year"] = pandas.to_numeric(
+        df["release_year"], errors="coerce"
+    ).astype("Int64")
+    # "90 min" -> duration_minutes, "3 Seasons" -> seasons
+    _duration = df["duration"].str.extract(DURATION_PATTERN, flags=re.IGNORECASE)
+    _amount = pandas.to_numeric(_duration["amount"]).astype("Int64")
+    _is_minutes = _duration["unit"].str.lower() == "min"
+    df["duration_minutes"] = _amount.where(_is_minutes)
+    df["seasons"] = _amount.where(_duration["unit"].notna() & ~_is_minutes)
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype("category")
+    return df
 
 
 def expand_list(df:pandas.DataFrame, column:str) -> pandas.DataFrame:
-    s = df[column].str.split(',').apply(pandas.Series,1).stack()
-    s.index = s.index.droplevel(-1)
-    s.name = column
-    return df[["show_id"]].join(s)
-
-
-directors = expand_list(flattened, "director")
-cast_members = expand_list(flattened, "cast")
-
-def generate_person_table(directors:pandas.DataFrame, cast_members:pandas.DataFrame) -> pandas.DataFrame:
-
-
-
-
-
-def get_show_to_cast_df(df:pandas.DataFrame):
-    s = df.cast.str.split(',').apply(pandas.Series,1).stack()
-    s.index = s.index.droplevel(-1)
-    s.name = "Person" # ValueError: Other Series must have a name
-
-
-
-
-
-
+    """One (show_id, <column>) row per element of the list column."""
+    s = df[["show_id", column]].explode(column)
+    return s.dropna().drop_duplicates().reset_index(drop=True)
+
+
+class EntityIds:
+    """Stable integer ids for names, grown chunk by chunk."""
+
+    def __init__(self):
+        self.names = pandas.Index([], dtype=object)
+
+    def assign(self, names:pandas.Series):
+        """Return (ids aligned with `names`, DataFrame of the newly seen names)."""
+        _new = pandas.Index(names.unique()).difference(self.names, sort=False)
+        _first_id = len(self.names) + 1
+        self.names = self.names.append(_new)
+        _ids = pandas.Series(self.names.get_indexer(names) + 1, index=names.index)
+        _created = pandas.DataFrame(
+            {"id": range(_first_id, _first_id + len(_new)), "name": _new}
+        )
+        return _ids, _created
+
+
+def generate_person_table(
+    shows:pandas.DataFrame, people_ids:EntityIds
+) -> tuple:
+    """Return (new people, show_people bridge with role) for a chunk of shows."""
+    _frames = []
+    for column, role in PERSON_ROLES.items():
+        _frame = expand_list(shows, column).rename(columns={column: "name"})
+        _frame["role"] = role
+        _frames.append(_frame)
+    _show_people = pandas.concat(_frames, ignore_index=True)
+    _ids, _people = people_ids.assign(_show_people["name"])
+    _show_people = pandas.DataFrame(
+        {
+            "show_id": _show_people["show_id"],
+            "person_id": _ids,
+            "role": pandas.Categorical(
+                _show_people["role"], categories=list(PERSON_ROLES.values())
+            ),
+        }
+    )
+    return _people.rename(columns={"id": "person_id"}), _show_people
+
+
+def generate_bridge_table(
+    shows:pandas.DataFrame, column:str, entity_ids:EntityIds, id_column:str
+) -> tuple:
+    """Return (new entities, show bridge) for a list column such as listed_in."""
+    _bridge = expand_list(shows, column)
+    _ids, _entities = entity_ids.assign(_bridge[column])
+    _bridge = pandas.DataFrame({"show_id": _bridge["show_id"], id_column: _ids})
+    return _entities.rename(columns={"id": id_column}), _bridge
+
+
+def iter_normalized(chunks):
+    """Yield a dict of table name -> DataFrame slice for every raw chunk.
+
+    Entity tables (people, genres, countries) only carry the names first seen
+    in that chunk, so concatenating every slice gives each table exactly once.
+    """
+    _people_ids, _genre_ids, _country_ids = EntityIds(), EntityIds(), EntityIds()
+    for chunk in chunks:
+        _shows = clean_shows(chunk)
+        _people, _show_people = generate_person_table(_shows, _people_ids)
+        _genres, _show_genres = generate_bridge_table(
+            _shows, "listed_in", _genre_ids, "genre_id"
+        )
+        _countries, _show_countries = generate_bridge_table(
+            _shows, "country", _country_ids, "country_id"
+        )
+        yield {
+            "shows": _shows,
+            "people": _people,
+            "show_people": _show_people,
+            "genres": _genres,
+            "show_genres": _show_genres,
+            "countries": _countries,
+            "show_countries": _show_countries,
+        }
+
+
+def normalize(path:str=CSV_PATH, chunksize:int=CHUNK_SIZE) -> dict:
+    """Every normalized table of the csv, fully in memory."""
+    _tables = {}
+    for _slice in iter_normalized(read_titles(path, chunksize)):
+        for name, frame in _slice.items():
+            _tables.setdefault(name, []).append(frame)
+    return {
+        name: pandas.concat(frames, ignore_index=True)
+        for name, frames in _tables.items()
+    }
+
+
+if __name__ == "__main__":
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument("csv", nargs="?", default=CSV_PATH)
+    _parser.add_argument(
+        "--out", default="normalized", help="directory for the output csv files"
+    )
+    _parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    _args = _parser.parse_args()
+
+    os.makedirs(_args.out, exist_ok=True)
+    _written = set()
+    for _slice in iter_normalized(read_titles(_args.csv, _args.chunksize)):
+        # the list columns are represented by the bridge tables
+        _slice["shows"] = _slice["shows"].drop(columns=list(LIST_COLUMNS))
+        for _name, _frame in _slice.items():
+            # append every later chunk to the file the first one created
+            _frame.to_csv(
+                os.path.join(_args.out, f"{_name}.csv"),
+                mode="a" if _name in _written else "w",
+                header=_name not in _written,
+                index=False,
+            )
+            _written.add(_name)